@@ -0,0 +1,228 @@
+import math
+import numpy as np
+from src.engine.mcts import SpatialMCTS, MCTSNode
+
+INITIAL_CAPACITY = 1024
+
+class ArrayTree:
+    """
+    Struct-of-Arrays search tree.
+    Node i is a row across flat NumPy arrays; the children of a node are one
+    contiguous block [child_start, child_start + child_count), so selection is
+    a vectorized PUCT argmax over a slice instead of a loop over Python objects.
+
+    Arrays grow by doubling. Node 0 is the root and the only node with a
+    stored state; every other board is its (slot, action, time) deltas
+    replayed on the root's (see board()).
+    """
+    def __init__(self, capacity=INITIAL_CAPACITY):
+        self.size = 0
+        self.visits = np.zeros(capacity, dtype=np.int32)
+        self.value_sum = np.zeros(capacity, dtype=np.float64)
+        self.prior = np.zeros(capacity, dtype=np.float32)
+        self.virtual_loss = np.zeros(capacity, dtype=np.int32)
+        self.parent = np.full(capacity, -1, dtype=np.int32)
+        self.action = np.zeros(capacity, dtype=np.int32)
+        self.slot = np.full(capacity, -1, dtype=np.int8) # Slot filled to reach the node
+        self.time = np.zeros(capacity, dtype=np.int8) # Turn index given to that slot
+        self.next_slot = np.full(capacity, -1, dtype=np.int8) # Slot its children fill (-1 = terminal)
+        self.child_start = np.full(capacity, -1, dtype=np.int32)
+        self.child_count = np.zeros(capacity, dtype=np.int32)
+        self.root_state = None
+        self._root_board = None
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def capacity(self):
+        return len(self.visits)
+
+    def _reserve(self, n):
+        if self.size + n <= self.capacity: return
+        cap = self.capacity
+        while cap < self.size + n:
+            cap *= 2
+        for name, fill in (('visits', 0), ('value_sum', 0), ('prior', 0), ('virtual_loss', 0),
+                           ('parent', -1), ('action', 0), ('slot', -1), ('time', 0), ('next_slot', -1),
+                           ('child_start', -1), ('child_count', 0)):
+            old = getattr(self, name)
+            new = np.full(cap, fill, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def add_root(self, state, slot, next_slot):
+        self._reserve(1)
+        self.size = 1
+        self.slot[0] = slot
+        self.next_slot[0] = next_slot
+        self.root_state = state
+        self._root_board = (state[0][0].cpu().numpy().astype(np.int64), state[5][0].cpu().numpy().astype(np.int64))
+        return 0
+
+    def board(self, node):
+        """(picks, times) of node: the root board with the deltas along its path applied."""
+        picks, times = self._root_board[0].copy(), self._root_board[1].copy()
+        while node > 0:
+            slot = self.slot[node]
+            picks[slot] = self.action[node]
+            times[slot] = self.time[node]
+            node = self.parent[node]
+        return picks, times
+
+    def add_children(self, node, actions, priors, times, next_slots):
+        """Appends one contiguous child block under node. Returns the first child index."""
+        n = len(actions)
+        self._reserve(n)
+        s = self.size
+        block = slice(s, s + n)
+        self.parent[block] = node
+        self.action[block] = actions
+        self.prior[block] = priors
+        self.slot[block] = self.next_slot[node]
+        self.time[block] = times
+        self.next_slot[block] = next_slots
+        self.child_start[node] = s
+        self.child_count[node] = n
+        self.size += n
+        return s
+
+    def select_child(self, node, c_puct):
+        """Virtual-loss PUCT over the child block (same scoring as SpatialMCTS.select_child)."""
+        s = self.child_start[node]
+        kids = slice(s, s + self.child_count[node])
+        # If filling a Blue Slot (0-4), we maximize Blue Win (Value); Red minimizes it
+        is_blue_picking = 0 <= self.next_slot[node] <= 4
+
+        vl = self.virtual_loss[kids]
+        n_eff = self.visits[kids] + vl
+        w_eff = self.value_sum[kids] if is_blue_picking else self.value_sum[kids] + vl
+        avg_val = w_eff / (n_eff + 1e-5)
+        q_score = avg_val if is_blue_picking else 1.0 - avg_val
+
+        u_val = c_puct * self.prior[kids] * math.sqrt(self.visits[node] + self.virtual_loss[node]) / (1 + n_eff)
+        return int(s + np.argmax(q_score + u_val))
+
+    def backprop(self, path, value):
+        """Adds one visit of value along path (distinct node indices) and releases its virtual loss."""
+        idx = np.asarray(path, dtype=np.int64)
+        self.virtual_loss[idx] -= 1
+        self.visits[idx] += 1
+        self.value_sum[idx] += value
+
+    def children(self, node):
+        s = self.child_start[node]
+        return range(s, s + self.child_count[node]) if s >= 0 else range(0)
+
+    def to_node(self, node=0, depth=1, parent=None):
+        """MCTSNode view of node and `depth` levels below it (for formatting and Tree Reuse)."""
+        state = self.root_state if node == 0 else None
+        view = MCTSNode(state, parent=parent, action=int(self.action[node]), slot_idx=int(self.slot[node]),
+                        time=int(self.time[node]))
+        view.visits = int(self.visits[node])
+        view.value_sum = float(self.value_sum[node])
+        view.prior = float(self.prior[node])
+        view.next_slot = int(self.next_slot[node])
+        if self.child_count[node] > 0:
+            view.expanded_slot = int(self.next_slot[node])
+            if depth > 0:
+                for c in self.children(node):
+                    view.children[int(self.action[c])] = self.to_node(c, depth - 1, view)
+        return view
+
+class ArrayMCTS(SpatialMCTS):
+    """
+    SpatialMCTS over an ArrayTree (settings: search_tree = "array").
+    Same priors, masks, rollouts, evaluation cache and Anytime Mode; the tree is
+    kept as flat arrays in self.tree and search() returns an MCTSNode view of
+    the root and its children.
+
+    Limits: no Transposition Table, no Tree Reuse (prev_root is ignored) and no
+    Progressive Widening (a child block is fixed when its parent is expanded).
+    """
+    def search(self, initial_tensors, active_slot_id, valid_actions=None, prev_root=None, pick_order=None, time_budget=None):
+        self._begin_search(pick_order, time_budget)
+        self.set_context(initial_tensors)
+        if self.endgame_budget > 0:
+            solved = self.solve_endgame(initial_tensors, active_slot_id, valid_actions)
+            if solved is not None:
+                return solved
+        tree = ArrayTree()
+        self.tree = tree
+        root = tree.add_root(initial_tensors, active_slot_id, active_slot_id)
+
+        # Expansion (Root)
+        candidates = self._root_candidates(initial_tensors, active_slot_id, valid_actions)
+        if candidates:
+            self._add_block(root, tree.board(root), [a for a, _ in candidates], [p for _, p in candidates])
+
+        n_sims = self.n_sims if self.deadline is None else self.max_sims
+        self._search_waves(n_sims)
+        self.root = tree.to_node(root)
+        return self.root
+
+    def _search_waves(self, n_sims):
+        """Batched Mode over the arrays: select -> expand -> rollout -> backprop, batch_size paths per wave."""
+        tree = self.tree
+        batch = max(1, self.batch_size)
+        sims_done = 0
+        while sims_done < n_sims:
+            wave = min(batch, n_sims - sims_done)
+
+            # 1. Selection (Virtual Loss steers later paths away from in-flight ones)
+            paths = []
+            for _ in range(wave):
+                node = 0
+                path = [node]
+                while tree.child_count[node] > 0:
+                    node = tree.select_child(node, self.c_puct)
+                    path.append(node)
+                tree.virtual_loss[path] += 1
+                paths.append(path)
+
+            # 2. Expansion (One forward pass for all distinct open leaves)
+            leaves = list(dict.fromkeys(p[-1] for p in paths if tree.next_slot[p[-1]] != -1))
+            if leaves:
+                boards = [tree.board(n) for n in leaves]
+                rows = self.evaluate_boards(boards)
+                for leaf, board, (row, _) in zip(leaves, boards, rows):
+                    self._expand_leaf(leaf, row, board)
+
+            expanded = set(leaves)
+            for path in paths:
+                leaf = path[-1]
+                if leaf in expanded and tree.child_count[leaf] > 0:
+                    # Highest prior child (blocks are stored in descending prior order)
+                    child = int(tree.child_start[leaf])
+                    tree.virtual_loss[child] += 1
+                    path.append(child)
+
+            # 3. Rollout / Evaluation (All leaves advance together, one forward pass per ply)
+            values = self.rollout_values([tree.board(path[-1]) for path in paths])
+
+            # 4. Backprop (and release Virtual Loss)
+            for path, value in zip(paths, values):
+                tree.backprop(path, value)
+
+            sims_done += wave
+            if self.should_stop(): break
+
+    def _expand_leaf(self, node, slot_logits, board, top_k=5):
+        """Creates the Top-K child block of a leaf for its next slot."""
+        probs = self.masked_softmax(slot_logits, self._board_mask(board[0]))
+        actions, priors = self._top_k(probs, top_k)
+        # Masked (banned / picked / illegal) tokens come out as exactly 0
+        legal = [(a, p) for a, p in zip(actions, priors) if p > 0]
+        if legal:
+            self._add_block(node, board, [a for a, _ in legal], [p for _, p in legal])
+
+    def _add_block(self, node, board, actions, priors):
+        """Appends the children of node for actions: only their time and next slot are computed."""
+        slot = int(self.tree.next_slot[node])
+        picks = board[0].copy()
+        time = min(30, int(board[1].max()) + 1)
+        next_slots = []
+        for a in actions:
+            picks[slot] = a
+            next_slots.append(self.next_empty(picks))
+        self.tree.add_children(node, actions, priors, [time] * len(actions), next_slots)
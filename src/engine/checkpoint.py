@@ -0,0 +1,131 @@
+import json
+import os
+import struct
+import hashlib
+import numpy as np
+import torch
+
+# --- Flat Checkpoint Archive (.titan) ---
+# Layout: MAGIC | header length (uint64 LE) | JSON header | padding | tensor data
+# The header is readable without touching the weights; tensors are memory-mapped.
+
+MAGIC = b"TITANCK\x01"
+FORMAT_VERSION = 1
+ARCHIVE_EXT = ".titan"
+DATA_ALIGN = 64 # Every tensor starts on this boundary (zero-copy dtype views)
+
+DTYPES = {
+    torch.float32: "float32",
+    torch.float16: "float16",
+    torch.int64: "int64",
+    torch.int32: "int32",
+    torch.uint8: "uint8",
+    torch.bool: "bool",
+}
+
+class CheckpointError(Exception):
+    """Malformed archive, or one that does not match what the caller expects."""
+
+def archive_path(model_path):
+    """Archive next to a checkpoint (titan_v3_best.pt -> titan_v3_best.titan)."""
+    return os.path.splitext(model_path)[0] + ARCHIVE_EXT
+
+def file_hash(path, chunk_size=1 << 20):
+    """sha256 of a file (e.g. the training data a checkpoint was fit on)."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _align(n):
+    return (n + DATA_ALIGN - 1) // DATA_ALIGN * DATA_ALIGN
+
+def write_archive(path, state_dict, metadata):
+    """
+    Writes state_dict (CPU copies of its tensors) and metadata (JSON-serializable:
+    architecture, vocab map, data hash, ...) as one archive. The file is
+    written next to path and renamed, so readers never see a partial archive.
+    """
+    arrays, tensors, offset = [], {}, 0
+    for name, t in state_dict.items():
+        t = t.detach().cpu().contiguous()
+        if t.dtype not in DTYPES:
+            raise CheckpointError(f"Unsupported dtype {t.dtype} for {name}")
+        offset = _align(offset)
+        tensors[name] = {"dtype": DTYPES[t.dtype], "shape": list(t.shape), "offset": offset}
+        arr = t.numpy()
+        arrays.append((offset, arr))
+        offset += arr.nbytes
+
+    header = json.dumps({"format": FORMAT_VERSION, "metadata": metadata, "tensors": tensors}).encode("utf-8")
+    data_start = _align(len(MAGIC) + 8 + len(header))
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        pos = len(MAGIC) + 8 + len(header)
+        for off, arr in arrays:
+            f.write(b"\0" * (data_start + off - pos))
+            f.write(arr.tobytes())
+            pos = data_start + off + arr.nbytes
+    os.replace(tmp, path)
+
+def read_header(path):
+    """Parses the header only (no weights read). Adds 'data_start', the byte offset of the tensor data."""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise CheckpointError(f"{path} is not a checkpoint archive")
+        (length,) = struct.unpack("<Q", f.read(8))
+        try:
+            header = json.loads(f.read(length).decode("utf-8"))
+        except ValueError as e:
+            raise CheckpointError(f"Corrupt header: {e}")
+    if header.get("format") != FORMAT_VERSION:
+        raise CheckpointError(f"Unsupported archive format {header.get('format')}")
+    header["data_start"] = _align(len(MAGIC) + 8 + length)
+    return header
+
+def check_tensors(header, state_dict):
+    """Raises CheckpointError unless the archive has exactly the names and shapes of state_dict."""
+    tensors = header["tensors"]
+    missing = [k for k in state_dict if k not in tensors]
+    unexpected = [k for k in tensors if k not in state_dict]
+    if missing or unexpected:
+        raise CheckpointError(f"Tensor names differ (missing {missing[:3]}, unexpected {unexpected[:3]})")
+    for name, t in state_dict.items():
+        if list(t.shape) != tensors[name]["shape"]:
+            raise CheckpointError(f"Shape of {name}: archive {tensors[name]['shape']}, model {list(t.shape)}")
+
+def check_vocab(header, vocab):
+    """
+    Raises CheckpointError if the archive was trained on another champion ->
+    token map than vocab (FeatureEngine.vocab), or has too few tokens for it.
+    Archives without a vocab map are only checked for size.
+    """
+    metadata = header.get("metadata", {})
+    vocab_size = metadata.get("config", {}).get("vocab_size", 0)
+    if vocab and max(vocab.values()) >= vocab_size:
+        raise CheckpointError(f"Vocab of {vocab_size} tokens does not cover token {max(vocab.values())}")
+    saved = metadata.get("vocab")
+    if saved and vocab:
+        moved = [cid for cid, tok in vocab.items() if str(cid) in saved and saved[str(cid)] != tok]
+        if moved:
+            raise CheckpointError(f"Champion tokens differ from the live vocab ({len(moved)} champions, e.g. {moved[0]})")
+
+def load_tensors(path, header=None):
+    """
+    {name: tensor} views into a copy-on-write memory map of the archive: no
+    weight is read or copied until it is touched, and writes stay private.
+    """
+    header = header or read_header(path)
+    data = np.memmap(path, dtype=np.uint8, mode="c", offset=header["data_start"])
+    tensors = {}
+    for name, spec in header["tensors"].items():
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"], dtype=np.int64))
+        start = spec["offset"]
+        arr = data[start:start + count * dtype.itemsize].view(dtype).reshape(spec["shape"])
+        tensors[name] = torch.from_numpy(arr)
+    return tensors
@@ -12,7 +12,21 @@ DEFAULT_CONFIG = {
     "risk_level": 0.5, # 0.0 = Safe, 1.0 = Aggro/Risky (Exploration)
     "auto_hover": True,
     "show_probability": True,
-    "ui_scale": 1.0
+    "ui_scale": 1.0,
+    "search_latency_ms": 800, # Target time per MCTS search (0 = fixed simulation count)
+    "search_autotune": True, # Measure model throughput at startup to size search batches
+    "search_workers": 0, # Root-Parallel MCTS processes (0 = single-process search)
+    "search_tree": "nodes", # "nodes" = MCTSNode tree (Tree Reuse), "array" = compact ArrayTree
+    "search_rollout_depth": 0, # Rollout plies before the Value Head judges (0 = fill the whole board)
+    "search_ponder": True, # Keep searching in the background while the enemy team picks
+    "search_prefetch": True, # Precompute recommendations for the likely enemy picks
+    "search_mode": "mcts", # "mcts" = tree search, "fast" = one-ply Value Head scoring (weak machines)
+    "search_endgame_budget": 10000, # Solve exactly when at most this many completions remain (0 = always search); capped by the search time at the autotuned throughput
+    "search_widening": 0.0, # Progressive Widening: children grow with visits, e.g. 2.0 (0 = off: fixed Top-20 root / Top-5 inner)
+    "search_root_policy": "puct", # Root move selection: "puct" or "gumbel" (Sequential Halving, strong at low budgets)
+    "inference_precision": "fp32", # "int8" = dynamic INT8 on CPU (check accuracy with src/tools/quantize_titan.py)
+    "inference_backend": "torch", # "onnx" = onnxruntime CPU session (export with src/tools/export_onnx.py)
+    "inference_sdpa_encoder": False # SDPA encoder loop in eval mode (matches the default encoder to float rounding only)
 }
 
 class SettingsManager:
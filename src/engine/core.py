@@ -7,7 +7,8 @@ import json
 
 # Internal Imports
 from src.infrastructure.lcu_connector import TitanLCU
-from src.engine.titan_brain import TitanBrain
+from src.engine.titan_brain import TitanBrain, compact_path
+from src.engine.checkpoint import ARCHIVE_EXT, CheckpointError, archive_path, check_vocab, read_header
 from src.engine.features import FeatureEngine
 from src.engine.mcts import SpatialMCTS
 from src.data.ddragon import DataDragon
@@ -63,18 +64,37 @@ class TitanEngine:
             os.path.join(src_dir, "checkpoints", "titan_v3_best.pt")
         ]
         
+        # Vocab-sliced copies for the live vocab first (src/tools/slice_vocab.py), then the full checkpoint
+        ckpt_candidates = [p for c in ckpt_candidates for p in (compact_path(c, len(self.fe.vocab) + 1), c)]
+        
+        # Flat archives first (memory-mapped, header checked against the live vocab before any weight is read)
+        ckpt_candidates = [p for c in ckpt_candidates for p in (archive_path(c), c)]
+        
+        # First candidate that passes its checks and loads (a stale or corrupt file falls through to the next)
         found_ckpt = None
         for c in ckpt_candidates:
-            if os.path.exists(c):
+            if not os.path.exists(c): continue
+            if c.endswith(ARCHIVE_EXT):
+                try:
+                    check_vocab(read_header(c), self.fe.vocab)
+                except CheckpointError as e:
+                    print(f"[TITAN] WARNING: Rejected {c}: {e}")
+                    continue
+            self.brain.model_path = c
+            if self.brain.load(precision=self.settings.get("inference_precision", "fp32"),
+                               backend=self.settings.get("inference_backend", "torch"),
+                               sdpa_encoder=self.settings.get("inference_sdpa_encoder", False)):
                 found_ckpt = c
                 break
+            print(f"[TITAN] WARNING: Could not load {c}. Trying the next checkpoint.")
              
         if found_ckpt:
-            self.brain.model_path = found_ckpt
-            self.brain.load()
             print(f"[TITAN] Loaded Checkpoint: {found_ckpt}")
+            if len(self.fe.vocab) >= self.brain.vocab_size:
+                print(f"[TITAN] WARNING: Checkpoint vocab ({self.brain.vocab_size}) does not cover "
+                      f"the {len(self.fe.vocab)} live champion tokens.")
         else:
-            print("[TITAN] WARNING: No checkpoint found. Using random weights.")
+            print("[TITAN] WARNING: No usable checkpoint found. Using random weights.")
             
         self.brain.model.eval()
         
@@ -96,6 +116,12 @@ class TitanEngine:
         # 6. Initialize Strategist (The Brain's Executive Function)
         from src.engine.strategist import DraftStrategist
         self.strategist = DraftStrategist(self.brain, self.fe, self.ddragon, self.lane_data)
+        if self.settings.get("search_autotune"):
+            self.strategist.autotune(self.settings)
+        # Warmup: one-time costs of the inference module at the search shapes
+        self.brain.warmup(batch_sizes=(1, self.strategist.search_batch_size))
+        # Root-Parallel workers: spawned now rather than inside the first search's time budget
+        self.strategist.start_parallel(self.settings)
 
         # 7. State
         self.last_hash = None
@@ -129,6 +155,7 @@ class TitanEngine:
             # Reset Caches
             self.last_hash = None
             self.cached_recs = []
+            self.strategist.reset_search()
             return 0.5, [], f"Status: {phase}", "Idle", ({}, [])
             
         # --- CHAMP SELECT ACTIVE ---
@@ -136,12 +163,7 @@ class TitanEngine:
         if not session: return 0.5, [], "Syncing...", "Loading", ({}, [])
         
         # 1. Parse Environment
-        current_patch = 14.23 # Fallback
-        if self.ddragon.version:
-             try:
-                 parts = self.ddragon.version.split('.')
-                 current_patch = float(f"{parts[0]}.{parts[1]}")
-             except: pass
+        current_patch = self._current_patch()
         
         skill = self.get_skill()
         
@@ -241,6 +263,22 @@ class TitanEngine:
         # Return: win, recs, status, lane_str, build, context
         return self.cached_winrate, self.cached_recs, "Drafting...", self.cached_lane_status, self.cached_build, context
 
+    def get_team_recommendations(self):
+        """
+        Suggestion cards for every open slot of our team: {cellId: [card, ...]}.
+        Empty outside Champ Select.
+        """
+        if not self.lcu.connected or self.lcu.get_gameflow_phase() != "ChampSelect":
+            return {}
+        session = self.lcu.get_champ_select()
+        if not session: return {}
+        return self.strategist.analyze_team(
+            session,
+            skill=self.get_skill(),
+            patch=self._current_patch(),
+            settings=self.settings
+        )
+
     def act_on_suggestion(self, champion_id):
         """
         Triggers an action in the LCU to hover the specified champion.
@@ -588,6 +626,15 @@ class TitanEngine:
         }
 
     # --- HELPERS ---
+    def _current_patch(self):
+        current_patch = 14.23 # Fallback
+        if self.ddragon.version:
+             try:
+                 parts = self.ddragon.version.split('.')
+                 current_patch = float(f"{parts[0]}.{parts[1]}")
+             except: pass
+        return current_patch
+
     def _detect_player_role(self, session):
          # Legacy: Strategist handles this internally now.
          # Kept as simple wrapper if external tools call it, but ideally we deprecate.
@@ -0,0 +1,79 @@
+from collections import OrderedDict
+
+# Rough per-entry overhead (key tuple, OrderedDict slot, float) on top of the logits row
+ENTRY_OVERHEAD_BYTES = 256
+
+class EvalCache:
+    """
+    Bounded LRU cache of TitanNet evaluations.
+    Lives in the DraftStrategist, so it survives between engine cycles and
+    between the fresh SpatialMCTS instances created for every analysis.
+
+    Key:   (model_key, state_key, next_slot) - model_key identifies the loaded
+           checkpoint; next_slot is the slot the row predicts (it depends on
+           the draft order, not only on the board).
+    Value: (logits_row, value) - policy row for next_slot + win prob.
+
+    Limits: max_entries and max_bytes (whichever is hit first evicts the LRU entry).
+
+    Not thread-safe: callers that share it with the ponder thread serialize
+    access through Ponderer (pause() before use, see ponder.py).
+    """
+    def __init__(self, max_entries=20000, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._store = OrderedDict()
+        self.nbytes = 0
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._store)
+
+    def __contains__(self, key):
+        return key in self._store
+
+    def get(self, key):
+        entry = self._store.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._store.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, row, value):
+        if key in self._store:
+            self.nbytes -= self._entry_bytes(self._store.pop(key))
+
+        entry = (row, value)
+        self._store[key] = entry
+        self.nbytes += self._entry_bytes(entry)
+
+        while self._store and (len(self._store) > self.max_entries or self.nbytes > self.max_bytes):
+            _, old = self._store.popitem(last=False)
+            self.nbytes -= self._entry_bytes(old)
+            self.evictions += 1
+        return entry
+
+    def clear(self):
+        self._store.clear()
+        self.nbytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._store),
+            "bytes": self.nbytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0
+        }
+
+    def _entry_bytes(self, entry):
+        row = entry[0]
+        return ENTRY_OVERHEAD_BYTES + (row.nbytes if row is not None else 0)
@@ -5,143 +5,704 @@ import torch
 import copy
 import time
 import numpy as np
+from collections import deque
+from src.engine.eval_cache import EvalCache
+
+# Root Exploration Noise (AlphaZero): Dirichlet concentration over root children
+DIRICHLET_ALPHA = 0.3
+
+# Endgame Solver / Fast Mode: boards per value-only forward pass
+ENDGAME_CHUNK = 1024
+
+# Progressive Widening: a node with n visits may have ceil(widening * (n + 1) ** WIDENING_ALPHA) children
+WIDENING_ALPHA = 0.5
+WIDENING_CANDIDATES = 20 # Ranked moves kept per inner node (the fixed mode creates Top-5)
+
+# Gumbel Root (Sequential Halving): moves sampled at the root, and the sigma(q) = (C_VISIT + max N) * C_SCALE * q transform
+GUMBEL_M = 16
+GUMBEL_C_VISIT = 50.0
+GUMBEL_C_SCALE = 1.0
 
 class MCTSNode:
-    def __init__(self, state_tensors, parent=None, action=None, slot_idx=0):
-        self.state = state_tensors # (picks, turns, bans, mast, meta)
+    """
+    Search tree node.
+    Delta Encoding: only a root (or a materialized node) keeps full state
+    tensors; every other node stores the (slot_idx, action, time) it adds to its
+    parent's board, and `state` / `board()` rebuild the board on demand.
+    """
+    def __init__(self, state_tensors, parent=None, action=None, slot_idx=0, time=None):
+        self._state = state_tensors # (picks, turns, bans, mast, meta, times) or None (delta node)
+        self._board = None # Cached (picks, times) arrays of _state
         self.parent = parent
         self.action = action # Champion ID picked to reach this state
         self.slot_idx = slot_idx # The slot (0-9) that was just filled
+        self.time = time # Turn index given to slot_idx (delta nodes)
         
         self.children = {} # Action -> Node
         self.visits = 0
         self.value_sum = 0.0
         self.prior = 0.0 # From Policy Head
+        self.expanded_slot = None # The slot (0-9) this node's children fill
+        self.next_slot = None # First empty slot in draft order (-1 = full board), set by the search
+        self.virtual_loss = 0 # Pending visits from in-flight batched simulations
+        self.solved = False # Children carry exact minimax values (Endgame Solver)
+        self.candidates = None # [(action, prior)] not created yet, best first (Progressive Widening)
+        self.schedule = None # Children the next simulations must visit, in order (Gumbel Root)
         
     def is_fully_expanded(self):
         return len(self.children) > 0
 
+    def _anchor(self):
+        """Returns (nearest ancestor with stored state, deltas from it to self)."""
+        node, deltas = self, []
+        while node._state is None:
+            deltas.append((node.slot_idx, node.action, node.time))
+            node = node.parent
+        return node, deltas
+
+    def board(self):
+        """(picks, times) as int64 arrays [10], rebuilt from the deltas."""
+        anchor, deltas = self._anchor()
+        if anchor._board is None:
+            anchor._board = (anchor._state[0][0].cpu().numpy().astype(np.int64),
+                             anchor._state[5][0].cpu().numpy().astype(np.int64))
+        picks, times = anchor._board[0].copy(), anchor._board[1].copy()
+        for slot, action, t in deltas:
+            picks[slot] = action
+            times[slot] = t
+        return picks, times
+
+    @property
+    def state(self):
+        if self._state is not None: return self._state
+        base = self._anchor()[0]._state
+        picks, times = self.board()
+        return (torch.from_numpy(picks).unsqueeze(0).to(base[0]), base[1], base[2], base[3], base[4],
+                torch.from_numpy(times).unsqueeze(0).to(base[5]))
+
+    def materialize(self):
+        """Stores the full state, so the node no longer depends on its parent chain."""
+        if self._state is None:
+            self._state = self.state
+
 class SpatialMCTS:
     """
     AlphaZero-Lite MCTS for Spatial TitanNet V3.5.
     
     Logic:
     1. Root Expansion: Only considers moves for the User's Active Slot.
-    2. Simulation: Fills remaining slots sequentially (0->9) using Policy Head hints.
-    3. Evaluation: Uses Value Head on the final 10-slot board.
+    2. Simulation: Fills remaining slots in draft order (pick_order, default 0->9) using Policy Head hints.
+    3. Evaluation: Uses Value Head on the final 10-slot board (or at the rollout_depth cutoff).
+    
+    Batched Mode (batch_size > 1):
+    Selects up to batch_size leaves per step, using virtual loss to spread them
+    over different branches, and evaluates them in one [N, 10] forward pass.
+    
+    Transpositions:
+    Nodes and network outputs are shared through a table keyed on state_key(),
+    so a board reached along two paths is searched and evaluated only once.
+    Network outputs go to an EvalCache, which callers can share between
+    searches (model_key must then identify the loaded checkpoint).
+    
+    Tree Reuse:
+    search(prev_root=...) adopts the subtrees of a previous search whose boards
+    match the new root's children, keeping their visits and priors.
+    
+    Progressive Widening:
+    With widening > 0, an expanded node keeps its ranked moves (Top-20 at the
+    root, Top-WIDENING_CANDIDATES below) in node.candidates and only creates
+    children as its visits grow: ceil(widening * (n + 1) ** WIDENING_ALPHA).
+    widening = 0 creates every Top-20 root child and Top-5 inner children at once.
+    
+    Gumbel Root:
+    root_policy = "gumbel" replaces PUCT at the root by Gumbel-Top-k sampling
+    of GUMBEL_M moves and Sequential Halving over them (Danihelka et al. 2022),
+    which needs far fewer simulations than PUCT spread over 20 children. Inner
+    nodes still use PUCT. The chosen move is the first most visited child.
+    
+    Anytime Mode:
+    search(time_budget=...) simulates until the deadline (capped at max_sims)
+    instead of a fixed n_sims. The tree is always valid: self.root can be read
+    and request_stop() called at any point, e.g. from another thread.
+    
+    Root Noise:
+    root_noise > 0 mixes Dirichlet noise (seeded by `seed`) into the root priors,
+    so independent searches of the same board explore differently.
+    
+    Endgame Solver:
+    With endgame_budget > 0, a root with at most one pick left after its own
+    (and at most endgame_budget completions) is solved by exact minimax over
+    Value Head evaluations instead of searched (root.solved = True).
+    
+    Delta States:
+    Below the root, nodes only store their (slot, action, time) delta. Search
+    code works on (picks, times) boards; turns/bans/mastery/meta are fixed for
+    the whole search (self.context) and boards are written into a reusable
+    input buffer only when a batch goes to the model (evaluate_boards).
+    
+    Prefix KV-Cache:
+    Search moves only add picks at later times than every root token, so root
+    tokens never attend to them. With incremental=True (and a model that has
+    build_prefix), the root is encoded once per search and batches that extend
+    it only compute their added tokens (TitanNet.forward_incremental).
+    Exported runtimes (TorchScript, ONNX) have no incremental entry points and
+    evaluate every batch in full.
     """
-    def __init__(self, model, feature_engine, c_puct=1.0, n_sims=50):
+    def __init__(self, model, feature_engine, c_puct=1.0, n_sims=50, batch_size=1, eval_cache=None, model_key=None, max_sims=5000,
+                 root_noise=0.0, seed=None, rollout_depth=None, endgame_budget=0, widening=0.0,
+                 root_policy="puct", incremental=True):
         self.model = model
         self.fe = feature_engine
         self.c_puct = c_puct
         self.n_sims = n_sims
+        self.max_sims = max_sims
+        self.batch_size = max(1, int(batch_size))
+        self.root_noise = root_noise
+        # Rollout Cutoff: plies simulated before the Value Head judges (None = fill the board)
+        self.rollout_depth = rollout_depth
+        # Endgame Solver: max completions enumerated exactly (0 = always search)
+        self.endgame_budget = endgame_budget
+        # Progressive Widening coefficient (0 = fixed Top-K expansion)
+        self.widening = widening
+        # Root Policy: "puct" or "gumbel" (Sequential Halving)
+        self.root_policy = root_policy
+        self.rng = np.random.default_rng(seed)
+        
+        # Validity Mask for the current search (see _build_base_mask)
+        self.base_mask = None
+        
+        # Anytime State
+        self.root = None
+        self.deadline = None
+        self._stop_requested = False
+        
+        # Transposition Table: state_key -> MCTSNode
+        self.tt = {}
+        # Network Memo: (model_key, state_key) -> (next-slot logits row, value)
+        self.net_cache = eval_cache if eval_cache is not None else EvalCache()
+        self.model_key = model_key
+        # Order in which empty slots get filled (Draft Order, default 0->9)
+        self.pick_order = list(range(10))
+        # Search Context: the board-independent inputs (turns, bans, mast, meta) of the root
+        self.context = None
+        self._context_key = None
+        # Input Buffer: picks/times rows of the boards in a batch (grown on demand)
+        self._in_picks = np.zeros((0, 10), dtype=np.int64)
+        self._in_times = np.zeros((0, 10), dtype=np.int64)
+        # Prefix KV-Cache of the search root (built on first use)
+        self.incremental = incremental
+        self._prefix = None
+        self._prefix_state = None
+        self._prefix_board = None
         self.device = model.device if hasattr(model, 'device') else getattr(next(model.parameters(), None), 'device', 'cpu') if model else 'cpu'
 
-    def search(self, initial_tensors, active_slot_id, valid_actions=None):
+    def search(self, initial_tensors, active_slot_id, valid_actions=None, prev_root=None, pick_order=None, time_budget=None):
         """
         initial_tensors: The starting board state.
         active_slot_id: The specific slot (0-9) the USER is filling.
         valid_actions: List of valid ChampIDs.
+        prev_root: Root returned by an earlier search, for Tree Reuse.
+        pick_order: Slots in draft order; simulations fill empty slots in this order.
+        time_budget: Seconds to search for (Anytime Mode). None = fixed n_sims.
         """
+        self._begin_search(pick_order, time_budget)
+        self.set_context(initial_tensors)
+        if self.endgame_budget > 0:
+            solved = self.solve_endgame(initial_tensors, active_slot_id, valid_actions)
+            if solved is not None:
+                return solved
+        self.tt = {}
         root = MCTSNode(initial_tensors, slot_idx=active_slot_id)
+        root.next_slot = active_slot_id
+        self.root = root
         
         # Expansion (Root)
         # We only expand moves for active_slot_id
-        # We need to ensure we are predicting for the right slot.
-        # But TitanNet predicts ALL slots.
-        # We assume the model's output at index 'active_slot_id' is the prediction?
-        # WAIT. TitanNet V3 output is [B, 10, Vocab].
-        # Index 0 corresponds to Picks 0.
-        # So yes, we look at policy_logits[:, active_slot_id, :]
-        
-        policy_logits, _, sort_idx = self.evaluate(root.state)
-        # policy_logits is [20, Vocab] after evaluate
-        
-        # Correctly map spatial slot back to its chronological state via sort_indices
-        target_raw_index = 11 + active_slot_id
-        try:
-            pos_in_sorted = np.where(sort_idx == target_raw_index)[0][0]
-            pred_index = max(0, pos_in_sorted - 1)
-        except IndexError:
-            pred_index = 10 + active_slot_id
-            
-        slot_logits = policy_logits[pred_index]
-        
-        valid_probs = self.mask_logits(slot_logits, initial_tensors, valid_actions)
-        
-        # Create children for top moves (Optimization: Don't create 160 children)
-        top_k = 20
-        # Convert valid_probs (numpy) to tensor
-        top_vals, top_indices = torch.topk(torch.tensor(valid_probs), top_k)
-        
-        for i in range(top_k):
-            action = top_indices[i].item()
-            prob = top_vals[i].item()
-            if prob <= 0: continue
+        self._expand_root(root, self._root_candidates(initial_tensors, active_slot_id, valid_actions))
             
-            # Create Child State
-            next_state = self.apply_move(root.state, action, active_slot_id)
-            child = MCTSNode(next_state, parent=root, action=action, slot_idx=active_slot_id)
-            child.prior = prob
-            root.children[action] = child
+        # Tree Reuse: continue from adopted statistics instead of a cold search
+        n_sims = self.n_sims if self.deadline is None else self.max_sims
+        if self._reuse_subtrees(root, prev_root) > 0:
+            n_sims = max(self.batch_size, n_sims - root.visits)
             
-        # Simulations
-        for _ in range(self.n_sims):
+        run = (lambda n: self._search_batched([root], n)) if self.batch_size > 1 else (lambda n: self._search_sequential(root, n))
+        if self.root_policy == "gumbel":
+            self._gumbel_search(root, n_sims, run)
+        else:
+            run(n_sims)
+        return root
+
+    def _search_sequential(self, root, n_sims):
+        """Runs n_sims single-path simulations from root (batch_size = 1)."""
+        for _ in range(n_sims):
             node = root
+            path = [node]
             
-            # 1. Selection
-            while node.is_fully_expanded() and not self.is_terminal(node.state):
+            # 1. Selection (terminal nodes are never expanded)
+            while node.is_fully_expanded():
+                self._widen(node)
                 node = self.select_child(node)
+                path.append(node)
                 
             # 2. Expansion (if not terminal)
-            if not self.is_terminal(node.state):
-                # Identify NEXT empty slot
-                next_slot = self.get_next_empty_slot(node.state)
-                if next_slot != -1:
-                    pol, _, sort_idx = self.evaluate(node.state)
-                    # For simulation, we just pick top moves for the CLONE
-                    # Expand Top 5
-                    target_raw_index = 11 + next_slot
-                    try:
-                        pos_in_sorted = np.where(sort_idx == target_raw_index)[0][0]
-                        pred_index = max(0, pos_in_sorted - 1)
-                    except IndexError:
-                        pred_index = 10 + next_slot
+            board = node.board()
+            if node.next_slot != -1:
+                row, _ = self.evaluate_boards([board])[0]
+                # For simulation, we just pick top moves for the CLONE
+                self._expand_inner(node, row, node.next_slot, board=board)
                         
-                    slot_logits = pol[pred_index]
-                    sub_valid = self.mask_logits(slot_logits, node.state, None) # All valid
-                    top_v, top_i = torch.topk(torch.tensor(sub_valid), 5)
-                    
-                    for i in range(5):
-                        a = top_i[i].item()
-                        if a not in node.children:
-                            ns = self.apply_move(node.state, a, next_slot)
-                            c = MCTSNode(ns, parent=node, action=a, slot_idx=next_slot)
-                            c.prior = top_v[i].item()
-                            node.children[a] = c
-                            
-                    # Pick one to proceed
-                    if node.children:
-                        # Greedy pick for simulation expansion or random based on priors?
-                        # Let's just pick the first one (highest prob)
-                        node = list(node.children.values())[0]
+                # Pick one to proceed
+                if node.children:
+                    # Greedy pick for simulation expansion or random based on priors?
+                    # Let's just pick the first one (highest prob)
+                    node = list(node.children.values())[0]
+                    path.append(node)
+                    board = node.board()
             
             # 3. Rollout / Evaluation (The Judge)
-            if self.is_terminal(node.state):
-                value = self.get_value(node.state)
-            else:
-                final_state = self.fast_rollout(node.state)
-                value = self.get_value(final_state)
+            value = self.rollout_values([board])[0]
             
-            # 4. Backprop
-            curr = node
-            while curr:
+            # 4. Backprop (along the traversed path: shared nodes have several parents)
+            for curr in path:
                 curr.visits += 1
                 curr.value_sum += value
-                curr = curr.parent
+                
+            # Anytime: at least one simulation, then stop on deadline/request
+            if self.should_stop(): break
+
+    def _gumbel_search(self, root, n_sims, run):
+        """
+        Gumbel Root: Sequential Halving over GUMBEL_M root moves sampled by
+        Gumbel-Top-k on the prior logits. Fixed mode spends n_sims in one pass;
+        Anytime Mode repeats passes of self.n_sims (same Gumbel draws, visits
+        accumulate) until the deadline or n_sims.
+        """
+        # Every root move is a candidate (Progressive Widening would hold some back)
+        if root.candidates:
+            board = root.board()
+            for a, p in root.candidates:
+                if a in root.children: continue
+                child = self._get_node(root, a, root.next_slot, board)
+                child.prior = p
+                root.children[a] = child
+            root.candidates = None
+        if not root.children:
+            return
+        gumbel = {a: float(g) + math.log(c.prior + 1e-12)
+                  for (a, c), g in zip(root.children.items(), self.rng.gumbel(size=len(root.children)))}
+        
+        budget = n_sims if self.deadline is None else min(self.n_sims, n_sims)
+        start = root.visits
+        while True:
+            chosen = self._sequential_halving(root, gumbel, budget, run)
+            if self.deadline is None or self.should_stop() or root.visits - start >= n_sims:
+                break
+            
+        # Most visited first; the chosen move leads among the most visited
+        ranked = sorted(root.children.items(), key=lambda ac: (ac[1].visits, ac[0] == chosen), reverse=True)
+        root.children = dict(ranked)
+
+    def _sequential_halving(self, root, gumbel, n_sims, run):
+        """
+        One Sequential Halving pass: log2(m) phases, each visiting the remaining
+        moves equally (round-robin through root.schedule) and keeping the better
+        half by gumbel + logit + sigma(q). Returns the chosen action.
+        """
+        def score(action):
+            return gumbel[action] + self._sigma_q(root, root.children[action])
+        remaining = sorted(gumbel, key=gumbel.get, reverse=True)[:max(1, min(GUMBEL_M, n_sims))]
+        phases = max(1, math.ceil(math.log2(len(remaining))))
+        sims_done = 0
+        for phase in range(phases):
+            if phase == phases - 1:
+                per_action = max(1, (n_sims - sims_done) // len(remaining))
+            else:
+                per_action = max(1, n_sims // (phases * len(remaining)))
+            root.schedule = deque(root.children[a] for _ in range(per_action) for a in remaining)
+            n = len(root.schedule)
+            try:
+                run(n)
+            finally:
+                root.schedule = None
+            sims_done += n
+            stopped = self.should_stop()
+            remaining = sorted(remaining, key=score, reverse=True)
+            if stopped: break
+            remaining = remaining[:math.ceil(len(remaining) / 2)]
+        return remaining[0]
+
+    def _sigma_q(self, root, child):
+        """sigma(q) of a root child: its mean value for the picking side (root mean if unvisited), scaled by visits."""
+        is_blue_picking = 0 <= root.expanded_slot <= 4
+        if child.visits > 0:
+            q = child.value_sum / child.visits
+        else:
+            q = root.value_sum / root.visits if root.visits > 0 else 0.5
+        if not is_blue_picking:
+            q = 1.0 - q
+        max_n = max(c.visits for c in root.children.values())
+        return (GUMBEL_C_VISIT + max_n) * GUMBEL_C_SCALE * q
+
+    def search_multi(self, initial_tensors, slots, valid_actions=None, pick_order=None, time_budget=None):
+        """
+        Multi-Root Search: one root per slot of the same board (e.g. every open
+        ally slot), searched together. The roots share one root evaluation, and
+        every wave selects batch_size paths per root into the same expansion and
+        rollout passes, Transposition Table and EvalCache.
+        Slots the Endgame Solver can decide are returned solved and not searched.
+        Roots always select by PUCT: Sequential Halving (root_policy "gumbel")
+        runs its own phases per root and cannot share the waves.
+        Returns {slot: root}.
+        """
+        self._begin_search(pick_order, time_budget)
+        self.set_context(initial_tensors)
+        self.tt = {}
+        solved = {}
+        if self.endgame_budget > 0:
+            for slot in slots:
+                root = self.solve_endgame(initial_tensors, slot, valid_actions)
+                if root is not None:
+                    solved[slot] = root
+        slots = [s for s in slots if s not in solved]
+        if not slots:
+            return solved
+        rows = self._root_rows(initial_tensors, slots)
+        
+        roots = {}
+        for slot, (row, _) in zip(slots, rows):
+            root = MCTSNode(initial_tensors, slot_idx=slot)
+            root.next_slot = slot
+            self._expand_root(root, self._root_candidates(initial_tensors, slot, valid_actions, row=row))
+            roots[slot] = root
+        if not roots:
+            return roots
+        self.root = next(iter(roots.values()))
+        
+        n_sims = self.n_sims if self.deadline is None else self.max_sims
+        self._search_batched(list(roots.values()), n_sims)
+        return {**solved, **roots}
+
+    def score_all(self, initial_tensors, active_slot_id, valid_actions=None, pick_order=None):
+        """
+        Fast Mode: one-ply scoring of every legal champion for active_slot_id.
+        All candidate boards are judged by value-only batched passes (no Policy
+        Head, no search, no rollouts). Returns a root whose children are
+        ranked best first for the picking side (see _ranked_root).
+        """
+        self._begin_search(pick_order, None)
+        self.set_context(initial_tensors)
+        board, actions = self._legal_root_actions(initial_tensors, active_slot_id, valid_actions)
+        values = self._board_values(*self._fill(board, active_slot_id, np.array(actions, dtype=np.int64)))
+        return self._ranked_root(initial_tensors, board, active_slot_id, actions, values)
+
+    def solve_endgame(self, initial_tensors, active_slot_id, valid_actions=None):
+        """
+        Endgame Solver: exact minimax when at most one empty slot (the reply)
+        remains after active_slot_id. Every (ours, reply) completion is
+        evaluated by the Value Head in ENDGAME_CHUNK batches; each of our picks
+        is worth the reply side's best answer.
+        Returns a solved root (see _ranked_root), or None if the position has
+        more open slots or completions than endgame_budget, or if the other
+        open slot picks before ours (pick_order).
+        """
+        board, ours = self._legal_root_actions(initial_tensors, active_slot_id, valid_actions)
+        rest = [s for s in self.pick_order if board[0][s] == 0 and s != active_slot_id]
+        if len(rest) > 1 or not ours:
+            return None
+            
+        if not rest:
+            # Last pick of the draft: one-ply scoring is exact
+            if len(ours) > self.endgame_budget: return None
+            values = self._board_values(*self._fill(board, active_slot_id, np.array(ours)))
+            root = self._ranked_root(initial_tensors, board, active_slot_id, ours, values)
+            root.solved = True
+            return root
+            
+        # Reply: any champion still legal after ours (valid_actions only restricts our pick)
+        reply = rest[0]
+        if self.pick_order.index(reply) < self.pick_order.index(active_slot_id):
+            return None # They pick first: our pick is the reply, not the move (search it)
+        replies = np.flatnonzero(self._board_mask(board[0]))
+        ours_arr = np.array(ours)
+        keep = replies[None, :] != ours_arr[:, None] # [n_ours, n_replies]
+        n_reply = int(keep.sum(axis=1).min())
+        if n_reply == 0 or len(ours) * n_reply > self.endgame_budget:
+            return None
+        pairs = np.broadcast_to(replies, keep.shape)[keep].reshape(len(ours), -1)[:, :n_reply]
+        
+        picks, times = self._fill(board, active_slot_id, np.repeat(ours_arr, n_reply))
+        picks[:, reply] = pairs.reshape(-1)
+        times[:, reply] = np.minimum(30, times[0].max() + 1)
+        values = self._board_values(picks, times).reshape(len(ours), n_reply)
+        
+        # Minimax: the reply side answers with its best champion
+        best_reply = values.max(axis=1) if 0 <= reply <= 4 else values.min(axis=1)
+        root = self._ranked_root(initial_tensors, board, active_slot_id, ours, [float(v) for v in best_reply])
+        root.solved = True
+        return root
+
+    def _legal_root_actions(self, initial_tensors, active_slot_id, valid_actions):
+        """Builds the base mask for the live vocab; returns (root board, legal actions for active_slot_id)."""
+        vocab_size = len(getattr(self.fe, 'vocab', None) or {}) + 1
+        self.base_mask = self._build_base_mask(initial_tensors, vocab_size)
+        board = MCTSNode(initial_tensors).board()
+        mask = self._board_mask(board[0])
+        if valid_actions:
+            mask &= self._actions_mask(valid_actions, vocab_size)
+        return board, [int(a) for a in np.flatnonzero(mask)]
+
+    def _fill(self, board, slot, actions):
+        """Stacks board once per action with slot filled: (picks [N, 10], times [N, 10])."""
+        picks = np.repeat(board[0][None, :], len(actions), axis=0)
+        times = np.repeat(board[1][None, :], len(actions), axis=0)
+        picks[:, slot] = actions
+        times[:, slot] = min(30, int(board[1].max()) + 1)
+        return picks, times
+
+    def _board_values(self, picks, times):
+        """Value Head only, for [N, 10] boards in ENDGAME_CHUNK passes (bypasses the EvalCache)."""
+        values = np.empty(len(picks))
+        for i in range(0, len(picks), ENDGAME_CHUNK):
+            chunk = list(zip(picks[i:i + ENDGAME_CHUNK], times[i:i + ENDGAME_CHUNK]))
+            values[i:i + ENDGAME_CHUNK] = self._forward_boards(chunk)[1]
+        return values
 
+    def _ranked_root(self, initial_tensors, board, slot, actions, values):
+        """
+        One-level root over actions for slot, ranked best first for the picking
+        side. Children: visits=1, value_sum=value, prior=win chance of the picking side.
+        """
+        root = MCTSNode(initial_tensors, slot_idx=slot)
+        root.next_slot = slot
+        root.expanded_slot = slot
+        self.root = root
+        if not actions:
+            return root
+            
+        # Every candidate fills the same slot: same turn time and next slot
+        t = min(30, int(board[1].max()) + 1)
+        picks = board[0].copy()
+        picks[slot] = actions[0]
+        next_slot = self.next_empty(picks)
+        is_blue_picking = 0 <= slot <= 4
+        for a, v in sorted(zip(actions, values), key=lambda av: av[1], reverse=is_blue_picking):
+            child = MCTSNode(None, parent=root, action=a, slot_idx=slot, time=t)
+            child.next_slot = next_slot
+            child.visits = 1
+            child.value_sum = v
+            child.prior = v if is_blue_picking else 1.0 - v
+            root.children[a] = child
+            root.visits += 1
+            root.value_sum += v
         return root
 
+    def _begin_search(self, pick_order, time_budget):
+        """Resets per-search control state (stop flag, deadline, draft order)."""
+        self._stop_requested = False
+        self.deadline = time.perf_counter() + time_budget if time_budget is not None else None
+        if pick_order:
+            self.pick_order = list(pick_order)
+
+    def _root_rows(self, initial_tensors, slots):
+        """
+        [(logits_row, value)] of the root board for each of slots, served by
+        net_cache like leaf evaluations (misses share one pass). Sets the search
+        context to initial_tensors unless it already is.
+        """
+        if self._prefix_state is not initial_tensors:
+            self.set_context(initial_tensors)
+        board = MCTSNode(initial_tensors).board()
+        state_key = self.board_state_key(*board)
+        keys = [(self.model_key, state_key, slot) for slot in slots]
+        return self._cached_rows(keys, [board] * len(slots), self._forward_boards)
+
+    def _root_candidates(self, initial_tensors, active_slot_id, valid_actions, top_k=20, row=None):
+        """
+        Returns [(action, prior)] for the root's active slot (masked, top_k, with root noise).
+        Also builds this search's base validity mask.
+        row: the root's logits row for active_slot_id if already fetched (_root_rows).
+        """
+        # TitanNet predicts ALL slots: the row for active_slot_id is the output of
+        # the token just before that slot in chronological (sorted) order.
+        slot_logits = row if row is not None else self._root_rows(initial_tensors, [active_slot_id])[0][0]
+        
+        # Validity Masks: bans + vocab once per search, valid_actions for the root only
+        self.base_mask = self._build_base_mask(initial_tensors, len(slot_logits))
+        root_mask = self._board_mask(initial_tensors[0][0].cpu().numpy())
+        if valid_actions:
+            root_mask &= self._actions_mask(valid_actions, len(slot_logits))
+        valid_probs = self.masked_softmax(slot_logits, root_mask)
+        
+        # Create children for top moves (Optimization: Don't create 160 children)
+        top_indices, top_vals = self._top_k(valid_probs, top_k)
+        candidates = [(a, p) for a, p in zip(top_indices, top_vals) if p > 0]
+        
+        if self.root_noise > 0 and candidates:
+            noise = self.rng.dirichlet([DIRICHLET_ALPHA] * len(candidates))
+            candidates = [(a, (1 - self.root_noise) * p + self.root_noise * float(n))
+                          for (a, p), n in zip(candidates, noise)]
+        return candidates
+
+    def _search_batched(self, roots, n_sims):
+        """
+        Runs n_sims simulations per root in waves of batch_size paths per root.
+        Each wave: select leaves under virtual loss -> one batched expansion pass
+        -> lockstep batched rollouts (values included) -> backprop.
+        """
+        sims_done = 0
+        while sims_done < n_sims:
+            wave = min(self.batch_size, n_sims - sims_done)
+            
+            # 1. Selection (Virtual Loss steers later paths away from in-flight ones)
+            paths = []
+            for root in roots:
+                for _ in range(wave):
+                    node = root
+                    path = [node]
+                    node.virtual_loss += 1
+                    while node.is_fully_expanded():
+                        self._widen(node)
+                        node = self.select_child(node)
+                        node.virtual_loss += 1
+                        path.append(node)
+                    paths.append(path)
+                
+            # 2. Expansion (One forward pass for all distinct open leaves)
+            leaves = []
+            seen = set()
+            for path in paths:
+                leaf = path[-1]
+                if id(leaf) in seen or leaf.children or leaf.next_slot == -1:
+                    continue
+                seen.add(id(leaf))
+                leaves.append(leaf)
+                
+            if leaves:
+                boards = [leaf.board() for leaf in leaves]
+                rows = self.evaluate_boards(boards)
+                for leaf, board, (row, _) in zip(leaves, boards, rows):
+                    self._expand_inner(leaf, row, leaf.next_slot, board=board)
+                    
+            for path in paths:
+                leaf = path[-1]
+                if id(leaf) in seen and leaf.children:
+                    child = next(iter(leaf.children.values()))
+                    child.virtual_loss += 1
+                    path.append(child)
+                    
+            # 3. Rollout / Evaluation (All leaves advance together, one forward pass per ply)
+            values = self.rollout_values([path[-1].board() for path in paths])
+            
+            # 4. Backprop (and release Virtual Loss)
+            for path, value in zip(paths, values):
+                for node in path:
+                    node.virtual_loss -= 1
+                    node.visits += 1
+                    node.value_sum += value
+                    
+            sims_done += wave
+            if self.should_stop(): break
+
+    def _reuse_subtrees(self, root, prev_root):
+        """
+        Tree Reuse: if root's board extends prev_root's board (picks were added
+        in other slots, same bans/meta), the previous subtrees whose boards equal
+        root's children become those children, with their visits and priors kept.
+        Boards are matched without times: live boards carry the LCU turn
+        schedule, search boards carry search order.
+        Returns the number of adopted children.
+        """
+        if prev_root is None or prev_root.slot_idx != root.slot_idx:
+            return 0
+        old_key = self.board_key(prev_root.state)
+        new_key = self.board_key(root.state)
+        if old_key[1:] != new_key[1:]:
+            return 0
+        if any(o != 0 and o != n for o, n in zip(old_key[0], new_key[0])):
+            return 0
+            
+        # Index the previous tree by picks (bans/meta are equal, checked above).
+        # Transpositions: the most visited node for a board wins
+        index = {}
+        seen = set()
+        stack = list(prev_root.children.values())
+        while stack:
+            node = stack.pop()
+            if id(node) in seen: continue
+            seen.add(id(node))
+            key = tuple(node.board()[0].tolist())
+            best = index.get(key)
+            if best is None or node.visits > best.visits:
+                index[key] = node
+            stack.extend(node.children.values())
+            
+        # Root moves: created children and, with Progressive Widening, pending candidates
+        board = root.board()
+        moves = [(a, c.prior, c.board()) for a, c in root.children.items()]
+        moves += [(a, p, self.apply_board_move(board, a, root.slot_idx)) for a, p in root.candidates or []]
+        adopted = []
+        for action, prior, child_board in moves:
+            old = index.get(tuple(child_board[0].tolist()))
+            if old is None: continue
+            # Its deltas are relative to the old parent chain: store the full state first
+            old.materialize()
+            adopted.append((action, prior, old))
+            
+        reused = 0
+        for action, prior, old in adopted:
+            old.parent = root
+            old.action = action
+            old.slot_idx = root.slot_idx
+            old.prior = prior
+            root.children[action] = old
+            root.visits += old.visits
+            root.value_sum += old.value_sum
+            reused += 1
+        if root.candidates:
+            root.candidates = [(a, p) for a, p in root.candidates if a not in root.children]
+            
+        if reused:
+            # Rebuild the Transposition Table (and next slots) from the new tree
+            stack = list(root.children.values())
+            while stack:
+                node = stack.pop()
+                picks, times = node.board()
+                key = self.board_state_key(picks, times)
+                if key in self.tt: continue
+                self.tt[key] = node
+                node.next_slot = self.next_empty(picks)
+                if node.expanded_slot is not None and node.expanded_slot != node.next_slot:
+                    # Draft order changed: its children fill another slot. Re-expanded on the next visit
+                    node.children = {}
+                    node.candidates = None
+                    node.schedule = None
+                    node.expanded_slot = None
+                stack.extend(node.children.values())
+        return reused
+
+    def request_stop(self):
+        """Ends a running search after the current simulation (or wave)."""
+        self._stop_requested = True
+
+    def should_stop(self):
+        if self._stop_requested: return True
+        return self.deadline is not None and time.perf_counter() >= self.deadline
+
+    def measure_throughput(self, state, batch_sizes=(1, 4, 8, 16, 32), repeats=3):
+        """
+        Autotuner probe: times batched forward passes of `state` on this host.
+        Returns {batch_size: seconds per forward pass}.
+        """
+        timings = {}
+        for b in batch_sizes:
+            states = [state] * b
+            self.evaluate_batch(states) # Warmup (allocator, kernels)
+            t0 = time.perf_counter()
+            for _ in range(repeats):
+                self.evaluate_batch(states)
+            timings[b] = (time.perf_counter() - t0) / repeats
+        return timings
+
     def get_move(self, root):
         if not root.children: return None
         best_action = max(root.children.items(), key=lambda item: item[1].visits)[0]
@@ -150,17 +711,23 @@ class SpatialMCTS:
     # --- Helpers ---
 
     def select_child(self, node):
+        if node.schedule:
+            return node.schedule.popleft() # Gumbel Root: visits assigned by Sequential Halving
         best_score = -float('inf')
         best_child = None
         
-        # Determine perspective
-        next_slot = self.get_next_empty_slot(node.state)
+        # Determine perspective (the slot this node's children fill)
+        next_slot = node.expanded_slot
         # If filling a Blue Slot (0-4), we maximize Blue Win (Value).
         # If filling Red Slot (5-9), we minimize Blue Win (Value).
         is_blue_picking = (0 <= next_slot <= 4)
         
         for action, child in node.children.items():
-            avg_val = child.value_sum / (child.visits + 1e-5)
+            # Virtual Loss: in-flight visits count as losses for the side to move
+            vl = child.virtual_loss
+            n_eff = child.visits + vl
+            w_eff = child.value_sum if is_blue_picking else child.value_sum + vl
+            avg_val = w_eff / (n_eff + 1e-5)
             
             # If the child represents a state after "Blue Picked",
             # The value is "Win Prob". Blue wants High Win Prob.
@@ -178,7 +745,7 @@ class SpatialMCTS:
             else:
                 q_score = 1.0 - avg_val
                 
-            u_val = self.c_puct * child.prior * math.sqrt(node.visits) / (1 + child.visits)
+            u_val = self.c_puct * child.prior * math.sqrt(node.visits + node.virtual_loss) / (1 + n_eff)
             score = q_score + u_val
             
             if score > best_score:
@@ -187,6 +754,108 @@ class SpatialMCTS:
                 
         return best_child
 
+    def _pred_index(self, sort_idx, slot):
+        """Maps a spatial slot to the sorted position whose output predicts it."""
+        target_raw_index = 11 + slot
+        try:
+            pos_in_sorted = np.where(sort_idx == target_raw_index)[0][0]
+            return max(0, pos_in_sorted - 1)
+        except IndexError:
+            return 10 + slot
+
+    def _expand_root(self, root, candidates):
+        """Creates the root's children for its slot from [(action, prior)] (all, or the first few when widening)."""
+        root.expanded_slot = root.next_slot
+        if self.widening > 0:
+            root.candidates = list(candidates)
+            self._widen(root)
+            return
+        board = root.board()
+        for action, prob in candidates:
+            # Create Child (delta node)
+            child = self._get_node(root, action, root.next_slot, board)
+            child.prior = prob
+            root.children[action] = child
+
+    def _widen(self, node, board=None):
+        """Progressive Widening: creates the next candidates of node once its visits allow more children."""
+        if not node.candidates: return
+        allowed = math.ceil(self.widening * (node.visits + node.virtual_loss + 1) ** WIDENING_ALPHA)
+        if len(node.children) >= max(1, allowed): return
+        if board is None: board = node.board()
+        while node.candidates and len(node.children) < max(1, allowed):
+            a, p = node.candidates.pop(0)
+            if a in node.children: continue
+            c = self._get_node(node, a, node.expanded_slot, board)
+            c.prior = p
+            node.children[a] = c
+
+    def _expand_inner(self, node, slot_logits, next_slot, top_k=5, board=None):
+        """Creates the Top-K children of an inner node for next_slot (ranked candidates when widening)."""
+        if board is None: board = node.board()
+        node.expanded_slot = next_slot
+        sub_valid = self.masked_softmax(slot_logits, self._board_mask(board[0]))
+        if self.widening > 0:
+            top_i, top_v = self._top_k(sub_valid, WIDENING_CANDIDATES)
+            node.candidates = [(a, p) for a, p in zip(top_i, top_v) if p > 0]
+            self._widen(node, board)
+            return
+        top_i, top_v = self._top_k(sub_valid, top_k)
+        
+        for a, p in zip(top_i, top_v):
+            if a not in node.children:
+                c = self._get_node(node, a, next_slot, board)
+                c.prior = p
+                node.children[a] = c
+
+    def state_key(self, state):
+        """
+        Canonical hash key of a board: (picks, bans, meta, times).
+        Times are part of the key because they drive TitanNet's causal mask.
+        Seat IDs and mastery are fixed for the whole search.
+        """
+        return (
+            tuple(state[0][0].tolist()),
+            tuple(state[2][0].tolist()),
+            tuple(state[4][0].tolist()),
+            tuple(state[5][0].tolist()),
+        )
+
+    def board_key(self, state):
+        """state_key without times: identifies the same picks regardless of order."""
+        return self.state_key(state)[:3]
+
+    def set_context(self, state):
+        """Fixes the board-independent inputs of a search (everything but picks and times)."""
+        self.context = state[1:5]
+        self._context_key = (tuple(state[2][0].tolist()), tuple(state[4][0].tolist()))
+        self._prefix = None
+        self._prefix_state = state
+        self._prefix_board = MCTSNode(state).board()
+
+    def board_state_key(self, picks, times):
+        """state_key of a (picks, times) board in the search context."""
+        bans, meta = self._context_key
+        return (tuple(picks.tolist()), bans, meta, tuple(times.tolist()))
+
+    def _get_node(self, parent, action, slot_idx, parent_board):
+        """Returns the shared node for parent + move, creating a delta node on first visit."""
+        picks, times = self.apply_board_move(parent_board, action, slot_idx)
+        key = self.board_state_key(picks, times)
+        node = self.tt.get(key)
+        if node is None:
+            node = MCTSNode(None, parent=parent, action=action, slot_idx=slot_idx, time=int(times[slot_idx]))
+            node.next_slot = self.next_empty(picks)
+            self.tt[key] = node
+        return node
+
+    def apply_board_move(self, board, action, slot_idx):
+        """apply_move on a (picks, times) board; returns new arrays."""
+        picks, times = board[0].copy(), board[1].copy()
+        picks[slot_idx] = action
+        times[slot_idx] = min(30, int(times.max()) + 1)
+        return picks, times
+
     def apply_move(self, state, action, slot_idx):
         picks = state[0].clone()
         picks[0][slot_idx] = action
@@ -197,8 +866,12 @@ class SpatialMCTS:
         return (picks, state[1], state[2], state[3], state[4], times)
 
     def get_next_empty_slot(self, state):
-        picks = state[0][0]
-        for i in range(10):
+        return self.next_empty(state[0][0])
+
+    def next_empty(self, picks):
+        """First empty slot of a picks row in draft order (-1 = full board)."""
+        picks = picks.tolist()
+        for i in self.pick_order:
             if picks[i] == 0: return i
         return -1
 
@@ -208,52 +881,229 @@ class SpatialMCTS:
     def evaluate(self, state):
         self.model.eval()
         with torch.no_grad():
-            out = self.model(state[0], state[1], state[2], state[3], state[4], x_times=state[5])
+            out = self.model(*state) # Positional: exported (TorchScript) modules take no keywords
         # Returns [20, Vocab], Value, and the Sort Map
         return out['policy'][0].cpu().numpy(), out['value'].item(), out['sort_indices'][0].cpu().numpy()
 
+    def evaluate_batch(self, states):
+        """
+        Stacks N states into [N, 10] inputs and runs a single forward pass.
+        Returns policy [N, 20, Vocab], values [N] and sort maps [N, 21].
+        """
+        batch = [torch.cat([s[i] for s in states], dim=0) for i in range(6)]
+        self.model.eval()
+        with torch.no_grad():
+            out = self.model(*batch)
+        return out['policy'].cpu().numpy(), out['value'][:, 0].cpu().numpy(), out['sort_indices'].cpu().numpy()
+
+    def evaluate_rows(self, states):
+        """
+        Returns [(logits_row, value)] per state, where logits_row is the policy row
+        predicting the state's next empty slot (None if the board is full).
+        Boards found in net_cache are served from it; the rest share one
+        batched forward pass.
+        """
+        # The row depends on which slot is next (pick_order), so it is part of the key
+        keys = [(self.model_key, self.state_key(s), self.get_next_empty_slot(s)) for s in states]
+        return self._cached_rows(keys, states, self._forward_states)
+
+    def evaluate_boards(self, boards):
+        """evaluate_rows for (picks, times) boards in the search context (same cache keys)."""
+        keys = [(self.model_key, self.board_state_key(p, t), self.next_empty(p)) for p, t in boards]
+        return self._cached_rows(keys, boards, self._forward_boards)
+
+    def _forward_states(self, states, slots=None):
+        """_infer() over full state tuples, stacked into one [N, 10] batch."""
+        return self._infer(tuple(torch.cat([s[i] for s in states], dim=0) for i in range(6)), slots)
+
+    def _forward_boards(self, boards, slots=None):
+        """
+        _infer() over boards: picks/times are copied into the preallocated input
+        buffer and the context tensors are broadcast (no per-board tensors).
+        Batches that extend the search root go through the Prefix KV-Cache.
+        """
+        n = len(boards)
+        if len(self._in_picks) < n:
+            cap = max(n, 2 * len(self._in_picks), 16)
+            self._in_picks = np.zeros((cap, 10), dtype=np.int64)
+            self._in_times = np.zeros((cap, 10), dtype=np.int64)
+        for i, (picks, times) in enumerate(boards):
+            self._in_picks[i] = picks
+            self._in_times[i] = times
+            
+        turns, bans, mast, meta = (c.expand(n, -1) for c in self.context)
+        dev = turns.device
+        x_picks = torch.from_numpy(self._in_picks[:n]).to(dev)
+        x_times = torch.from_numpy(self._in_times[:n]).to(dev)
+        if self._extends_prefix(n):
+            if self._prefix is None:
+                with torch.no_grad():
+                    self._prefix = self.model.build_prefix(*self._prefix_state)
+            return self._infer((x_picks, x_times), slots, prefix=self._prefix)
+        return self._infer((x_picks, turns, bans, mast, meta, x_times), slots)
+
+    def _infer(self, inputs, slots=None, prefix=None):
+        """
+        One no-grad model pass. inputs: (picks, turns, bans, mast, meta, times),
+        or (picks, times) with a prefix (Prefix KV-Cache).
+        slots: per board, the slot whose policy row is wanted (-1 = none);
+        None = Value Head only.
+        Returns (rows [N, Vocab] or None, values [N]) as NumPy arrays.
+        """
+        model = self.model
+        model.eval()
+        with torch.no_grad():
+            if hasattr(model, 'predict_rows'):
+                # Only the needed head work: one policy row per board, or none
+                if prefix is not None:
+                    encoded = model.encode_incremental(prefix, *inputs)
+                else:
+                    encoded = model.encode(*inputs)
+                if slots is None:
+                    return None, model.predict_value(encoded).cpu().numpy()
+                rows, values = model.predict_rows(encoded, torch.as_tensor(slots, device=inputs[0].device))
+                return rows.cpu().numpy(), values.cpu().numpy()
+                
+            # Generic models: full forward, rows picked on the host
+            if prefix is not None:
+                out = model.forward_incremental(prefix, *inputs)
+            else:
+                out = model(*inputs)
+            values = out['value'][:, 0].cpu().numpy()
+            if slots is None:
+                return None, values
+            pol, sort_idx = out['policy'].cpu().numpy(), out['sort_indices'].cpu().numpy()
+            rows = np.stack([pol[j][self._pred_index(sort_idx[j], s) if s != -1 else 0] for j, s in enumerate(slots)])
+            return rows, values
+
+    def _extends_prefix(self, n):
+        """
+        True if the Prefix KV-Cache can serve the n boards in the input buffer:
+        root picks and times kept, only empty slots filled, at distinct times
+        later than every root time.
+        """
+        if not self.incremental or self._prefix_board is None or not hasattr(self.model, 'forward_incremental'):
+            return False
+        root_picks, root_times = self._prefix_board
+        picks, times = self._in_picks[:n], self._in_times[:n]
+        added = (root_picks == 0) & (picks != 0)
+        if not np.where(added, times > root_times.max(), (picks == root_picks) & (times == root_times)).all():
+            return False
+        # Distinct added times (the others are replaced by distinct negatives)
+        ordered = np.sort(np.where(added, times, -1 - np.arange(10)), axis=1)
+        return not (np.diff(ordered, axis=1) == 0).any()
+
+    def _cached_rows(self, keys, items, forward):
+        """Serves keys from net_cache and evaluates the distinct misses with forward(items, slots)."""
+        results = [None] * len(items)
+        missing = {} # key -> (item, [result indices])
+        for i, (key, item) in enumerate(zip(keys, items)):
+            if key in missing:
+                missing[key][1].append(i)
+                continue
+            entry = self.net_cache.get(key)
+            if entry is not None:
+                results[i] = entry
+            else:
+                missing[key] = (item, [i])
+                
+        if missing:
+            rows, values = forward([item for item, _ in missing.values()], [key[2] for key in missing])
+            for j, (key, (_, idxs)) in enumerate(missing.items()):
+                row = rows[j].copy() if key[2] != -1 else None
+                entry = self.net_cache.put(key, row, float(values[j]))
+                for i in idxs:
+                    results[i] = entry
+                
+        return results
+
     def get_value(self, state):
-        _, val, _ = self.evaluate(state)
-        return val
+        """Value Head for one state: from net_cache if present, else a value-only pass."""
+        entry = self.net_cache.get((self.model_key, self.state_key(state), self.get_next_empty_slot(state)))
+        if entry is not None:
+            return entry[1]
+        return float(self._forward_states([state])[1][0])
+
+    # --- Validity Masks (boolean [Vocab], True = legal) ---
+
+    def _build_base_mask(self, state, vocab_size):
+        """Legal tokens for the whole search: no padding token, no bans, only live champion tokens."""
+        mask = np.ones(vocab_size, dtype=bool)
+        mask[0] = False
+        live = len(getattr(self.fe, 'vocab', None) or {})
+        if 0 < live < vocab_size - 1:
+            mask[live + 1:] = False
+        bans = state[2][0].cpu().numpy()
+        mask[bans[(bans > 0) & (bans < vocab_size)]] = False
+        return mask
+
+    def _board_mask(self, picks):
+        """Base mask minus the champions already on this board (picks row [10])."""
+        mask = self.base_mask.copy()
+        mask[picks[picks < len(mask)]] = False
+        return mask
+
+    def _actions_mask(self, valid_actions, vocab_size):
+        mask = np.zeros(vocab_size, dtype=bool)
+        idx = np.fromiter(valid_actions, dtype=np.int64)
+        mask[idx[(idx >= 0) & (idx < vocab_size)]] = True
+        return mask
+
+    def masked_softmax(self, logits, mask):
+        """Softmax restricted to mask (illegal entries come out as exactly 0)."""
+        z = np.where(mask, logits, -np.inf)
+        m = np.max(z)
+        if not np.isfinite(m):
+            return np.zeros(len(logits), dtype=np.float32)
+        probs = np.exp(z - m) # Stability; exp(-inf) = 0
+        probs /= np.sum(probs)
+        return probs
+
+    def _top_k(self, probs, k):
+        """Returns (indices, values) of the k largest entries, descending."""
+        k = min(k, len(probs))
+        idx = np.argpartition(-probs, k - 1)[:k]
+        idx = idx[np.argsort(-probs[idx], kind='stable')]
+        return [int(i) for i in idx], [float(probs[i]) for i in idx]
 
     def mask_logits(self, logits, state, valid_actions):
         # logits is numpy array [Vocab]
-        probs = np.exp(logits - np.max(logits)) # Stability
-        probs /= np.sum(probs)
-        
-        # Mask already picked
-        picked = set(state[0][0].tolist())
-        for i in range(len(probs)):
-            if i in picked or i == 0:
-                probs[i] = 0.0
-                
+        if self.base_mask is None or len(self.base_mask) != len(logits):
+            self.base_mask = self._build_base_mask(state, len(logits))
+        mask = self._board_mask(state[0][0].cpu().numpy())
         if valid_actions:
-            for i in range(len(probs)):
-                if i not in valid_actions:
-                    probs[i] = 0.0
-                    
-        s = np.sum(probs)
-        if s > 0: probs /= s
-        return probs
+            mask &= self._actions_mask(valid_actions, len(logits))
+        return self.masked_softmax(logits, mask)
 
-    def fast_rollout(self, state):
-        curr = state
-        while True:
-            slot = self.get_next_empty_slot(curr)
-            if slot == -1: break
-            
-            pol, _, sort_idx = self.evaluate(curr)
-            
-            target_raw_index = 11 + slot
-            try:
-                pos_in_sorted = np.where(sort_idx == target_raw_index)[0][0]
-                pred_index = max(0, pos_in_sorted - 1)
-            except IndexError:
-                pred_index = 10 + slot
-                
-            slot_logits = pol[pred_index]
-            probs = self.mask_logits(slot_logits, curr, None)
-            action = np.argmax(probs)
-            
-            curr = self.apply_move(curr, action, slot)
-        return curr
+    def rollout_values(self, boards):
+        """
+        Batched Rollouts: greedily fills the empty slots of all boards in lockstep
+        (one forward pass per ply for every board still running) and returns the
+        value of each final board.
+        Truncation: a board stops after rollout_depth plies (None = full board)
+        and takes the Value Head of the pass that reached it, so there is no
+        separate value pass.
+        """
+        curr = list(boards)
+        # Incremental masks: start from each board, then drop each rollout pick
+        masks = [self._board_mask(b[0]) for b in curr]
+        values = [None] * len(curr)
+        active = list(range(len(curr)))
+        depth = 0
+        while active:
+            rows = self.evaluate_boards([curr[i] for i in active])
+            running = []
+            for i, (slot_logits, value) in zip(active, rows):
+                slot = self.next_empty(curr[i][0])
+                done = slot == -1 or not masks[i].any()
+                if done or (self.rollout_depth is not None and depth >= self.rollout_depth):
+                    values[i] = value
+                    continue
+                # Greedy: argmax of the masked logits (softmax is monotonic)
+                action = int(np.argmax(np.where(masks[i], slot_logits, -np.inf)))
+                masks[i][action] = False
+                curr[i] = self.apply_board_move(curr[i], action, slot)
+                running.append(i)
+            active = running
+            depth += 1
+        return values
@@ -0,0 +1,133 @@
+import os
+import random
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+
+from src.engine.titan_brain import TitanNet
+from src.engine.features import FeatureEngine
+from src.engine.mcts import SpatialMCTS, MCTSNode
+
+# Per-process state of a search worker (set by _init_worker)
+_WORKER = {}
+
+def _init_worker(model_config, state_dict, vocab, threads):
+    """Builds this worker's TitanNet on the shared-memory weights (no private copy)."""
+    torch.set_num_threads(threads)
+    with torch.device("meta"): # No weights of its own: the parameters become the shared tensors
+        model = TitanNet(**model_config)
+    model.load_state_dict(state_dict, assign=True)
+    model.eval()
+    _WORKER['model'] = model
+    _WORKER['fe'] = FeatureEngine(vocab=vocab)
+
+def _ready(_):
+    return 'model' in _WORKER
+
+def _run_search(task):
+    """Runs one independent search and returns its root statistics."""
+    seed = task['seed']
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+
+    mcts = SpatialMCTS(_WORKER['model'], _WORKER['fe'], n_sims=task['n_sims'], batch_size=task['batch_size'],
+                       root_noise=task['root_noise'], seed=seed, rollout_depth=task['rollout_depth'],
+                       widening=task['widening'], root_policy=task['root_policy'])
+    root = mcts.search(task['state'], task['slot'], task['valid_actions'],
+                       pick_order=task['pick_order'], time_budget=task['time_budget'])
+    return {a: (c.visits, c.value_sum, c.prior) for a, c in root.children.items()}
+
+class RootParallelMCTS:
+    """
+    Root-Parallel MCTS.
+    Starts `workers` processes, each with its own TitanNet (weights shared via
+    torch shared memory), and runs one independent SpatialMCTS per worker from the
+    same root with different seeds and root noise. Root visit counts and value
+    sums are merged into a single root for DraftStrategist to format.
+
+    Limits: no Tree Reuse or shared EvalCache across workers (each process keeps its own).
+    """
+    def __init__(self, model, feature_engine, workers=None, n_sims=50, batch_size=8, root_noise=0.25, seed=0,
+                 rollout_depth=None, widening=0.0, root_policy="puct"):
+        self.model = model
+        self.fe = feature_engine
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.n_sims = n_sims
+        self.batch_size = batch_size
+        self.root_noise = root_noise
+        self.seed = seed
+        self.rollout_depth = rollout_depth
+        self.widening = widening
+        self.root_policy = root_policy
+        self._pool = None
+
+    def start(self):
+        """Spawns the workers and builds their models (the pool would otherwise start them on the first search)."""
+        if self._pool is not None: return
+        state_dict = {k: v.detach().cpu().share_memory_() for k, v in self.model.state_dict().items()}
+        # Spawn (not fork): safe with torch threads and the only option on Windows
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=mp.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(self.model.config, state_dict, dict(self.fe.vocab), 1)
+        )
+        list(self._pool.map(_ready, range(self.workers)))
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def search(self, initial_tensors, active_slot_id, valid_actions=None, pick_order=None, time_budget=None):
+        """Same contract as SpatialMCTS.search; the returned root has merged children only."""
+        self.start()
+        state = tuple(t.detach().cpu() for t in initial_tensors)
+        # Each worker gets an equal share of the simulation count
+        per_worker = max(1, self.n_sims // self.workers)
+
+        tasks = []
+        for k in range(self.workers):
+            tasks.append({
+                'seed': self.seed + k,
+                'state': state,
+                'slot': active_slot_id,
+                'valid_actions': set(valid_actions) if valid_actions else None,
+                'pick_order': pick_order,
+                'n_sims': per_worker,
+                'time_budget': time_budget,
+                'batch_size': self.batch_size,
+                'rollout_depth': self.rollout_depth,
+                'widening': self.widening,
+                'root_policy': self.root_policy,
+                'root_noise': self.root_noise if k > 0 else 0.0 # Worker 0 searches the clean priors
+            })
+        self.seed += self.workers
+
+        results = list(self._pool.map(_run_search, tasks))
+        return self._merge(state, active_slot_id, results)
+
+    def _merge(self, state, active_slot_id, results):
+        root = MCTSNode(state, slot_idx=active_slot_id)
+        root.expanded_slot = active_slot_id
+        helper = SpatialMCTS(None, self.fe)
+        prior_sums = {}
+
+        for stats in results:
+            for action, (visits, value_sum, prior) in stats.items():
+                child = root.children.get(action)
+                if child is None:
+                    child = MCTSNode(helper.apply_move(state, action, active_slot_id), parent=root,
+                                     action=action, slot_idx=active_slot_id)
+                    root.children[action] = child
+                child.visits += visits
+                child.value_sum += value_sum
+                prior_sums[action] = prior_sums.get(action, 0.0) + prior
+                root.visits += visits
+                root.value_sum += value_sum
+
+        for action, child in root.children.items():
+            child.prior = prior_sums[action] / len(results)
+        return root
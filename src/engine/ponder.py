@@ -0,0 +1,193 @@
+import threading
+from collections import deque
+
+# Background Pondering
+PONDER_TOP_K = 3 # Enemy picks (Policy Head Top-K) searched ahead
+PONDER_SLICE_SECONDS = 0.1 # Search time per step; pause() waits at most one wave of it
+PONDER_MAX_VISITS = 4000 # Root visits after which a hypothesis stops growing
+PONDER_READY_VISITS = 200 # A pondered root this deep needs only a short confirmation search
+
+class Ponderer:
+    """
+    Background Pondering.
+    While the enemy team is picking, a daemon thread keeps searching OUR slot on
+    the boards their most likely picks lead to (Top-K of the Policy Head for the
+    enemy slot). Each hypothesis is grown in short slices through Tree Reuse, so
+    when the enemy locks in, take() returns a deep root for the real board.
+
+    Tasks: other background work (e.g. speculative recommendations) can be
+    queued with resume(tasks=...); tasks run first, one per step.
+    
+    Threading: the ponder thread runs one search or task at a time, under
+    self.lock, and only while not paused. The model, the shared EvalCache (not
+    thread-safe) and the pondered roots are therefore the owner's exactly
+    between pause() (which waits for the running slice) and resume():
+    - the owner calls pause() before using the model or the EvalCache itself;
+    - take() pauses on its own and removes the root it returns, so the owner
+      may change it (Tree Reuse) without the ponder thread touching it again;
+    - tasks run on the ponder thread and must not adopt or change trees the
+      owner holds (e.g. DraftStrategist.last_root).
+    The pause flag, job, tasks and running search are guarded by a Condition
+    the thread waits on, so a resume() can never be missed between its check
+    for work and its wait.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.roots = {} # board_key -> pondered root
+        self.job = None
+        self.tasks = deque() # () -> bool (False = interrupted, run again)
+        self._paused = False
+        self._current = None
+        self._cond = threading.Condition()
+        # resume() count, and the count at which the job last had nothing left to grow
+        self._generation = 0
+        self._done_generation = -1
+        self._thread = None
+
+    def resume(self, job=None, tasks=None):
+        """
+        Restarts pondering. Without arguments the current job and tasks continue;
+        otherwise they are replaced (job=None: tasks only). job:
+            key:           identifies the situation (roots are kept while it is unchanged)
+            make_mcts:     () -> SpatialMCTS (model, caches and settings of the owner)
+            state:         search board (our slot empty)
+            slot:          our slot
+            enemy_slot:    the enemy slot that picks next
+            valid_actions: legal tokens for our slot
+            pick_order:    draft order of the slots
+        """
+        with self._cond:
+            if job is None and tasks is not None:
+                self.job = None
+                self.roots = {}
+            if tasks is not None or job is not None:
+                self.tasks = deque(tasks or [])
+            if job is not None:
+                if self.job is None or job['key'] != self.job['key']:
+                    # The draft moved on: earlier hypotheses can no longer match
+                    self.roots = {}
+                    self.job = dict(job, hypotheses=None)
+                else:
+                    self.job = dict(job, hypotheses=self.job['hypotheses'])
+            self._paused = False
+            self._generation += 1
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="titan-ponder", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def pause(self):
+        """Stops the running slice and waits for it (the tree stays valid)."""
+        with self._cond:
+            self._paused = True
+            current = self._current
+        if current is not None:
+            current.request_stop()
+        with self.lock:
+            pass
+
+    def stop(self):
+        """Pauses and forgets the job and every pondered root."""
+        self.pause()
+        with self._cond:
+            self.job = None
+            self.tasks.clear()
+            self.roots = {}
+
+    def track(self, mcts):
+        """Registers the search a task is running, so pause() can cut it short."""
+        with self._cond:
+            self._current = mcts
+            paused = self._paused
+        if paused:
+            mcts.request_stop()
+
+    def interrupted(self):
+        return self._paused
+
+    def take(self, key):
+        """
+        Hands over the pondered root for a board_key (or None). Pauses first, so
+        no slice is still searching it, and drops it from self.roots. Owner thread only.
+        """
+        self.pause()
+        return self.roots.pop(key, None)
+
+    def _has_work(self):
+        """Caller holds self._cond."""
+        if self._paused:
+            return False
+        return bool(self.tasks) or (self.job is not None and self._done_generation != self._generation)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(self._has_work)
+            with self.lock:
+                with self._cond:
+                    # pause() may have come in before the lock was taken
+                    if not self._has_work():
+                        continue
+                    if self.tasks:
+                        task = self.tasks.popleft()
+                    else:
+                        task, job, generation = None, self.job, self._generation
+                if task is not None:
+                    self._run_task(task)
+                    continue
+                mcts = job['make_mcts']()
+                self.track(mcts)
+                # pause() may have come in while the search was built
+                if self.interrupted():
+                    self._untrack()
+                    continue
+                try:
+                    grew = self._step(mcts, job)
+                except Exception as e:
+                    print(f"[TITAN] Ponder Error: {e}")
+                    grew = False
+                finally:
+                    self._untrack()
+            if not grew:
+                with self._cond:
+                    # Every hypothesis is deep enough: idle until the next resume()
+                    self._done_generation = generation
+
+    def _untrack(self):
+        with self._cond:
+            self._current = None
+
+    def _run_task(self, task):
+        try:
+            if task() is False:
+                with self._cond:
+                    self.tasks.appendleft(task) # Cut short by pause(): run it again on resume()
+        except Exception as e:
+            print(f"[TITAN] Background Task Error: {e}")
+        finally:
+            self._untrack()
+
+    def _step(self, mcts, job):
+        """Grows the shallowest hypothesis by one slice. Returns False when all are done."""
+        if job['hypotheses'] is None:
+            # 1. Likely enemy picks (Policy Head row of the enemy slot)
+            enemy_valid = job['valid_actions']
+            candidates = mcts._root_candidates(job['state'], job['enemy_slot'], enemy_valid, top_k=PONDER_TOP_K)
+            job['hypotheses'] = []
+            for action, _ in candidates:
+                board = mcts.apply_move(job['state'], action, job['enemy_slot'])
+                job['hypotheses'].append((mcts.board_key(board), board, action))
+
+        # 2. Shallowest hypothesis first
+        open_h = [h for h in job['hypotheses']
+                  if self.roots.get(h[0]) is None or self.roots[h[0]].visits < PONDER_MAX_VISITS]
+        if not open_h:
+            return False
+        key, board, action = min(open_h, key=lambda h: self.roots[h[0]].visits if h[0] in self.roots else 0)
+
+        # 3. One slice, continuing the previous root (Tree Reuse)
+        root = mcts.search(board, job['slot'], job['valid_actions'] - {action},
+                           prev_root=self.roots.get(key), pick_order=job['pick_order'],
+                           time_budget=PONDER_SLICE_SECONDS)
+        self.roots[key] = root
+        return True
@@ -1,15 +1,29 @@
 
 import torch
 import time
+import threading
 import math
+import copy
 from src.engine.mcts import SpatialMCTS
+from src.engine.array_tree import ArrayMCTS
+from src.engine.eval_cache import EvalCache
+from src.engine.parallel_mcts import RootParallelMCTS
+from src.engine.ponder import Ponderer, PONDER_READY_VISITS
+
+# Anytime Search Budget
+TIMER_SHARE = 0.25 # Max share of the remaining phase timer spent searching
+MIN_SEARCH_SECONDS = 0.05
+AUTOTUNE_WAVE_SHARE = 0.1 # One batched forward pass may take this share of the latency target
+
+# Speculative Prefetch
+PREFETCH_TOP_K = 3 # Likely enemy picks whose recommendations are computed ahead
 
 class DraftStrategist:
     """
     Central brain for interpreting the draft state and generating recommendations.
     Shared by both the CLI (live_engine.py) and GUI (titan_app.py).
     """
-    def __init__(self, brain, feature_engine, data_dragon, lane_metrics=None):
+    def __init__(self, brain, feature_engine, data_dragon, lane_metrics=None, eval_cache=None):
         self.brain = brain
         self.fe = feature_engine
         self.dd = data_dragon
@@ -18,6 +32,33 @@ class DraftStrategist:
         # Caching
         self.last_base_hash = None
         self.last_recs_cache = ([], [], []) # suggestions, ids, visits
+        # TitanNet evaluations, shared by every search of the session
+        self.eval_cache = eval_cache if eval_cache is not None else EvalCache()
+        # Root of the last search (Tree Reuse when the draft advances)
+        self.last_root = None
+        
+        # Search Sizing (see autotune)
+        self.search_batch_size = 8
+        self.evals_per_sec = None
+        # Root-Parallel search pool (settings: search_workers > 0)
+        self.parallel = None
+        self.parallel_key = None
+        # Background search during enemy picks (settings: search_ponder)
+        self.ponder = Ponderer()
+        # Speculative Prefetch: session_key -> analyze() result for a predicted enemy pick
+        self.prefetched = {}
+        # Foreground analyses (analyze, analyze_team, reset_search) run one at a time, from any
+        # thread: they share the model, the EvalCache and the ponder thread's pause/resume
+        self.analysis_lock = threading.Lock()
+        
+    def reset_search(self):
+        """Drops per-lobby search state (call when Champ Select ends)."""
+        with self.analysis_lock:
+            self.ponder.stop()
+            self.prefetched = {}
+            self.last_root = None
+            self.last_base_hash = None
+            self.last_recs_cache = ([], [], [])
         
     def _parse_bans_from_actions(self, session, am_i_blue):
         """Fallback: Extract bans from actions if 'bans' object is empty."""
@@ -50,6 +91,208 @@ class DraftStrategist:
         # print(f"[DEBUG] PARSED BANS RESULT: My={my_bans} Theirs={their_bans}")
         return my_bans, their_bans
 
+    def autotune(self, settings=None):
+        """
+        Startup Autotuner: measures TitanNet throughput on this host and picks the
+        largest MCTS batch whose forward pass fits the latency target.
+        """
+        target = self._latency_target(settings) or 0.8
+        dev = self.brain.device
+        probe = (
+            torch.zeros((1, 10), dtype=torch.long, device=dev),
+            torch.arange(1, 11, device=dev).unsqueeze(0),
+            torch.zeros((1, 10), dtype=torch.long, device=dev),
+            torch.zeros((1, 10), dtype=torch.float, device=dev),
+            torch.tensor([[6.0, 14.23, 0.0]], device=dev),
+            torch.tensor([[1, 4, 5, 8, 9, 2, 3, 6, 7, 10]], dtype=torch.long, device=dev)
+        )
+        mcts = SpatialMCTS(self.brain.runtime, self.fe)
+        timings = mcts.measure_throughput(probe)
+        
+        self.evals_per_sec = max(b / t for b, t in timings.items() if t > 0)
+        fitting = [b for b, t in timings.items() if t <= target * AUTOTUNE_WAVE_SHARE]
+        self.search_batch_size = max(fitting) if fitting else 1
+        print(f"[TITAN] Autotune: {self.evals_per_sec:.0f} evals/s, MCTS batch {self.search_batch_size}")
+        return self.evals_per_sec
+
+    def _get_parallel(self, settings):
+        """Returns the Root-Parallel searcher if enabled, (re)starting it for the loaded model."""
+        workers = int(settings.get("search_workers", 0)) if settings else 0
+        if workers <= 0:
+            if self.parallel:
+                self.parallel.shutdown()
+                self.parallel = None
+            return None
+            
+        key = (workers, self.brain.checkpoint_id, self._rollout_depth(settings), self._widening(settings),
+               self._root_policy(settings))
+        if self.parallel is None or self.parallel_key != key:
+            if self.parallel: self.parallel.shutdown()
+            self.parallel = RootParallelMCTS(self.brain.model, self.fe, workers=workers,
+                                             n_sims=50, batch_size=self.search_batch_size,
+                                             rollout_depth=self._rollout_depth(settings),
+                                             widening=self._widening(settings),
+                                             root_policy=self._root_policy(settings))
+            self.parallel_key = key
+        return self.parallel
+
+    def start_parallel(self, settings):
+        """Starts the Root-Parallel pool (if enabled) at engine startup, so worker spawn stays out of search budgets."""
+        parallel = self._get_parallel(settings)
+        if parallel:
+            parallel.start()
+        return parallel
+
+    def _rollout_depth(self, settings):
+        depth = int(settings.get("search_rollout_depth", 0)) if settings else 0
+        return depth if depth > 0 else None
+
+    def _widening(self, settings):
+        return max(0.0, float(settings.get("search_widening", 0.0))) if settings else 0.0
+
+    def _endgame_budget(self, session, settings):
+        """
+        Completions the Endgame Solver may evaluate: the setting, capped by what
+        the autotuned throughput gets through within this search's time budget.
+        """
+        budget = int(settings.get("search_endgame_budget", 0)) if settings else 0
+        seconds = self._search_budget(session, settings)
+        if budget > 0 and seconds is not None and self.evals_per_sec:
+            budget = min(budget, int(self.evals_per_sec * seconds))
+        return budget
+
+    def _root_policy(self, settings):
+        return "gumbel" if settings and settings.get("search_root_policy") == "gumbel" else "puct"
+
+    def _ponder_job(self, session, settings, search_cls, search_state, target_slot, valid_actions):
+        """Pondering job for the board we just searched, or None if it is not the enemy's turn."""
+        if not (settings and settings.get("search_ponder", True)) or search_cls is not SpatialMCTS:
+            return None
+        enemy_slot = self._next_enemy_slot(session)
+        if enemy_slot is None:
+            return None
+        rollout_depth = self._rollout_depth(settings)
+        widening = self._widening(settings)
+        root_policy = self._root_policy(settings)
+        def make_mcts():
+            return SpatialMCTS(self.brain.runtime, self.fe, batch_size=self.search_batch_size,
+                               eval_cache=self.eval_cache, model_key=self.brain.checkpoint_id,
+                               rollout_depth=rollout_depth, widening=widening, root_policy=root_policy)
+        helper = make_mcts()
+        return {
+            "key": (helper.board_key(search_state), target_slot, enemy_slot),
+            "make_mcts": make_mcts,
+            "state": search_state,
+            "slot": target_slot,
+            "enemy_slot": enemy_slot,
+            "valid_actions": set(valid_actions),
+            "pick_order": self._pick_order(session)
+        }
+
+    def _session_key(self, session, skill, patch, settings):
+        """Identifies everything analyze() reads from a lobby (volatile timers/flags excluded)."""
+        members = []
+        for p in session.get('myTeam', []) + session.get('theirTeam', []):
+            cid = p.get('championId', 0) or p.get('championPickIntent', 0)
+            members.append((p.get('cellId', -1), cid, p.get('assignedPosition', ''), p.get('team', p.get('teamId', 0))))
+        bans = session.get('bans', {})
+        ban_actions = tuple((a.get('actorCellId'), a.get('championId', 0))
+                            for turn in session.get('actions', []) for a in turn
+                            if a.get('type') == 'ban' and a.get('completed', False))
+        s_bias = settings.get("mastery_bias", 1.0) if settings else 1.0
+        s_risk = settings.get("risk_level", 0.0) if settings else 0.0
+        return (session.get('localPlayerCellId', -1), tuple(sorted(members)),
+                tuple(bans.get('myTeamBans', [])), tuple(bans.get('theirTeamBans', [])), ban_actions,
+                skill, patch, s_bias, s_risk)
+
+    def _speculative_session(self, session, cell, champ_id):
+        """Copy of the lobby in which `cell` has locked in champ_id."""
+        spec = copy.deepcopy(session)
+        for p in spec.get('myTeam', []) + spec.get('theirTeam', []):
+            if p.get('cellId') == cell:
+                p['championId'] = champ_id
+        for turn in spec.get('actions', []):
+            for action in turn:
+                if action.get('type') == 'pick' and action.get('actorCellId') == cell:
+                    action['championId'] = champ_id
+                    action['completed'] = True
+                    action['isInProgress'] = False
+        return spec
+
+    def _prefetch_tasks(self, session, skill, patch, settings, mastery, mcts, search_state, valid_actions):
+        """
+        Speculative Prefetch: one background task per likely enemy pick (Policy Head
+        Top-K for the enemy slot), each computing the full analyze() result for
+        the board after that pick.
+        """
+        if not (settings and settings.get("search_prefetch", True)):
+            return None
+        enemy_slot = self._next_enemy_slot(session)
+        if enemy_slot is None:
+            return None
+        inv_vocab = {v: k for k, v in self.fe.vocab.items()}
+        candidates = mcts._root_candidates(search_state, enemy_slot, valid_actions, top_k=PREFETCH_TOP_K)
+        
+        self.prefetched = {}
+        tasks = []
+        for token_id, _ in candidates:
+            real_id = inv_vocab.get(token_id, 0)
+            if real_id <= 0: continue
+            spec = self._speculative_session(session, enemy_slot, real_id)
+            def task(spec=spec):
+                out = self.analyze(spec, skill, patch, settings, mastery, speculative=True)
+                if out is None: return False
+                self.prefetched[self._session_key(spec, skill, patch, settings)] = out # (result, search)
+                return True
+            tasks.append(task)
+        return tasks
+
+    def _latency_target(self, settings):
+        ms = settings.get("search_latency_ms", 800) if settings else 800
+        return max(0.0, float(ms) / 1000.0)
+
+    def _search_budget(self, session, settings):
+        """
+        Seconds for this search: the latency target, cut down when the champ select
+        timer (adjustedTimeLeftInPhase) runs low. None = fixed n_sims.
+        """
+        budget = self._latency_target(settings)
+        if budget <= 0: return None
+        
+        left_ms = session.get('timer', {}).get('adjustedTimeLeftInPhase')
+        if left_ms:
+            budget = min(budget, TIMER_SHARE * left_ms / 1000.0)
+        return max(MIN_SEARCH_SECONDS, budget)
+
+    def _pick_order(self, session):
+        """Cells (= spatial slots) in the order the LCU schedules their picks."""
+        order = []
+        for turn in session.get('actions', []):
+            for action in turn:
+                cell = action.get('actorCellId', -1)
+                if action.get('type') == 'pick' and 0 <= cell <= 9 and cell not in order:
+                    order.append(cell)
+        # Slots without a scheduled action go last, in spatial order
+        order += [c for c in range(10) if c not in order]
+        return order
+
+    def _next_enemy_slot(self, session):
+        """
+        Cell of the enemy pick that comes next while our own pick is still open,
+        or None (our team's turn, our pick done, or no picks left).
+        """
+        local_cell = session.get('localPlayerCellId', -1)
+        if not 0 <= local_cell <= 9: return None
+        pending = []
+        for turn in session.get('actions', []):
+            for action in turn:
+                cell = action.get('actorCellId', -1)
+                if action.get('type') == 'pick' and not action.get('completed', False) and 0 <= cell <= 9:
+                    pending.append(cell)
+        if local_cell not in pending: return None
+        nxt = pending[0]
+        return nxt if (nxt < 5) != (local_cell < 5) else None
+
     def detect_player_role(self, session):
         """
         Asks the LCU for the user's assigned role.
@@ -194,12 +437,69 @@ class DraftStrategist:
         
         return (t_picks, t_turns, t_bans, t_mast, t_meta, t_times), (raw_picks, raw_bans)
 
-    def analyze(self, session, skill=6.0, patch=14.23, settings=None, mastery=None):
+    def analyze(self, session, skill=6.0, patch=14.23, settings=None, mastery=None, speculative=False, fast=None):
         """
         Full pipeline: Parse -> Think -> Recommend
         Returns: (suggestions_list, win_prob, lane_status_str, detailed_context_dict)
+        
+        fast: Fast Mode (one-ply Value Head scoring of every legal champion, no search).
+        None follows settings "search_mode".
+        
+        speculative: prefetch run on the background thread for a predicted board.
+        Searches from scratch (no Tree Reuse of trees the foreground owns), leaves
+        the search/recommendation caches alone and returns (result, search) for
+        _remember(), or None if pause() cut it short.
+        """
+        if speculative:
+            return self._analyze(session, skill, patch, settings, mastery, True, fast)
+            
+        with self.analysis_lock:
+            # The model and EvalCache are ours until the end of this call
+            self.ponder.pause()
+            restart = self.ponder.resume # On errors: continue the previous background work
+            try:
+                # Speculative Prefetch: the lock-in we predicted (no parse, search or formatting)
+                hit = self.prefetched.pop(self._session_key(session, skill, patch, settings), None)
+                if hit is not None:
+                    result, search = hit
+                    # The predicted pick happened: remaining hypotheses and prefetches are stale
+                    self.ponder.stop()
+                    self.prefetched = {}
+                    restart = None
+                    self._remember(search)
+                    return copy.deepcopy(result)
+                
+                result, search = self._analyze(session, skill, patch, settings, mastery, False, fast)
+                self._remember(search)
+                restart = lambda: self._resume_background(session, search)
+                return result
+            finally:
+                if restart is not None:
+                    restart()
+                
+    def _remember(self, search):
+        """Stores a search for Tree Reuse and the recommendation cache (search: see _analyze)."""
+        if search.get('root') is not None:
+            self.last_root = search['root']
+        if search.get('base_hash') is not None:
+            self.last_base_hash = search['base_hash']
+            self.last_recs_cache = search['recs']
+            
+    def _resume_background(self, session, search):
+        """Background Pondering / Prefetch after a foreground analysis: keep working while the enemy team picks."""
+        if search['ponder_job'] is not None or search['prefetch_tasks']:
+            self.ponder.resume(search['ponder_job'], tasks=search['prefetch_tasks'] or [])
+        elif search['cache_hit'] and (self.ponder.job is not None or self.ponder.tasks):
+            if self._next_enemy_slot(session) is not None:
+                self.ponder.resume()
+                
+    def _analyze(self, session, skill, patch, settings, mastery, speculative, fast):
+        """
+        analyze() without the ponder handling. Returns (result, search), search
+        holding what the caller stores or starts: root (Tree Reuse), base_hash
+        and recs (recommendation cache), ponder_job, prefetch_tasks, cache_hit.
+        Speculative runs return None if pause() cut them short.
         """
-        # 1. Parse
         # 1. Parse
         t_inputs, raw_inputs = self.parse_lobby(session, skill, patch)
         xp, xt, xb, xm, xmeta, x_times = t_inputs # Unpack Time Vector
@@ -284,19 +584,29 @@ class DraftStrategist:
         s_bias = settings.get("mastery_bias", 1.0) if settings else 1.0
         s_risk = settings.get("risk_level", 0.0) if settings else 0.0
         
-        current_base_hash = hash(tuple(base_picks) + tuple(raw_bans) + (skill, patch, s_bias, s_risk))
+        if fast is None:
+            fast = bool(settings) and settings.get("search_mode", "mcts") == "fast"
+        current_base_hash = hash(tuple(base_picks) + tuple(raw_bans) + (skill, patch, s_bias, s_risk, fast))
         
         # Check Cache
         cache_hit = False
-        if self.last_base_hash == current_base_hash:
+        if not speculative and self.last_base_hash == current_base_hash:
              cache_hit = True
              suggestions_cache, top_ids, top_visits = self.last_recs_cache
         
         state_tupid = (xp, xt, xb, xm, xmeta, x_times)
         
         # Always evaluate Dynamic Win Probability for the ACTUAL state (with hover)
-        mcts = SpatialMCTS(self.brain.model, self.fe, n_sims=50)
-        _, current_eval = mcts.evaluate(state_tupid)
+        search_cls = ArrayMCTS if settings and settings.get("search_tree", "nodes") == "array" else SpatialMCTS
+        mcts = search_cls(self.brain.runtime, self.fe, n_sims=50, batch_size=self.search_batch_size,
+                          eval_cache=self.eval_cache, model_key=self.brain.checkpoint_id,
+                          rollout_depth=self._rollout_depth(settings), widening=self._widening(settings),
+                          root_policy=self._root_policy(settings),
+                          endgame_budget=self._endgame_budget(session, settings))
+        current_eval = mcts.get_value(state_tupid)
+        ponder_job = None
+        prefetch_tasks = None
+        search = {'root': None, 'base_hash': None, 'recs': None}
         
         if picks_list[target_slot] != 0:
              win_prob = current_eval
@@ -320,112 +630,45 @@ class DraftStrategist:
              valid_actions -= picked_set
              valid_actions -= banned_set
              
-             root = mcts.search(search_state, target_slot, valid_actions)
-             
-             # Default sort by visits
-             items = list(root.children.items())
-             
-             # 1. Apply Mastery Bias
-             if mastery and settings:
-                 bias = settings.get("mastery_bias", 1.0)
-                 if abs(bias - 1.0) > 0.05:
-                     m_map = {m['championId']: m['championPoints'] for m in mastery}
-                     def score_func(x):
-                         cid, node = x
-                         raw_score = node.visits
-                         pts = m_map.get(cid, 0)
-                         log_pts = math.log10(pts + 1) 
-                         factor = 1.0 + (log_pts * 0.2 * (bias - 1.0))
-                         return raw_score * factor
-                     items.sort(key=score_func, reverse=True)
-                 else:
-                     items.sort(key=lambda x: x[1].visits, reverse=True)
+             parallel = None if (speculative or fast) else self._get_parallel(settings)
+             if fast:
+                 root = mcts.score_all(search_state, target_slot, valid_actions, pick_order=self._pick_order(session))
+             elif parallel:
+                 root = parallel.search(search_state, target_slot, valid_actions,
+                                        pick_order=self._pick_order(session),
+                                        time_budget=self._search_budget(session, settings))
              else:
-                 items.sort(key=lambda x: x[1].visits, reverse=True)
-
-             # 2. Apply Risk/Creativity
-             if settings:
-                 risk = settings.get("risk_level", 0.0)
-                 if risk > 0.1:
-                     import random
-                     candidates = items[:10]
-                     rest = items[10:]
-                     
-                     scored_candidates = []
-                     for i, item in enumerate(candidates):
-                         base_score = float(len(candidates) - i)
-                         noise = random.uniform(-1.0, 1.0) * risk * 5.0
-                         scored_candidates.append((base_score + noise, item))
-                     
-                     scored_candidates.sort(key=lambda x: x[0], reverse=True)
-                     items = [x[1] for x in scored_candidates] + rest
-
-             sorted_children = items
-             top_ids = [a for a, n in sorted_children[:5]]
-             top_visits = [n.visits for a, n in sorted_children[:5]]
-             
-             # --- Format Suggestions & Cache ---
-             suggestions = []
-             max_v = top_visits[0] if top_visits else 1
-             if max_v == 0: max_v = 1
+                 budget = self._search_budget(session, settings)
+                 if speculative:
+                     # Ponder thread: never adopt (and so rewire) the foreground's trees
+                     prev_root = None
+                     self.ponder.track(mcts)
+                 else:
+                     # Pondering may already have searched this board during the enemy pick
+                     pondered = self.ponder.take(mcts.board_key(search_state))
+                     if pondered is not None and pondered.visits >= PONDER_READY_VISITS and budget is not None:
+                         budget = MIN_SEARCH_SECONDS # Confirmation search only
+                     prev_root = pondered or self.last_root
+                 root = mcts.search(search_state, target_slot, valid_actions,
+                                    prev_root=prev_root, pick_order=self._pick_order(session),
+                                    time_budget=budget)
+                 if speculative:
+                     if self.ponder.interrupted(): return None
+                 else:
+                     ponder_job = self._ponder_job(session, settings, search_cls, search_state, target_slot, valid_actions)
+                     prefetch_tasks = self._prefetch_tasks(session, skill, patch, settings, mastery,
+                                                           mcts, search_state, valid_actions)
+             if not fast:
+                 search['root'] = root
              
-             # Maps Token -> Real ID
-             inv_vocab = {v: k for k, v in self.fe.vocab.items()}
+             # Fast Mode / Endgame Solver rank by win chance of the picking side (children carry it as prior)
+             strength = (lambda node: node.prior) if (fast or root.solved) else None
+             suggestions, top_ids, top_visits = self._format_suggestions(
+                 root, xp, target_slot, offset, win_prob, enemy_champ, settings, mastery, strength=strength)
              
-             for i, token_id in enumerate(top_ids):
-                score = int((top_visits[i] / max_v) * 100)
-                
-                # Convert Token to Real ID
-                real_id = inv_vocab.get(token_id, 0)
-                cid = real_id
-                
-                name = self.dd.get_id_map().get(real_id, f"{real_id}")
-                
-                # Resolve Asset ID (Name Key) using Real ID
-                asset_id = str(real_id)
-                for c_key, c_val in self.dd.champions.items():
-                     if int(c_val['key']) == real_id:
-                          asset_id = c_key
-                          break
-                          
-                # AI Confidence
-                child_node = next((n for a, n in sorted_children if a == token_id), None)
-                predicted_wr = 0.5
-                if child_node:
-                     if child_node.visits > 0:
-                         predicted_wr = child_node.value_sum / child_node.visits
-                     else:
-                         predicted_wr = child_node.prior
-                
-                # Stats
-                current_picks_sim = xp[0].cpu().tolist()
-                current_picks_sim[target_slot] = cid
-                
-                team_slice = current_picks_sim[0:5] if (offset == 0) else current_picks_sim[5:10]
-                stats = self._calculate_team_stats(team_slice)
-                stats_str = f"AD: {stats['ad']:.0f}% AP: {stats['ap']:.0f}%"
-                
-                rec_data = {
-                    "id": str(asset_id),
-                    "name": name,
-                    "score": score,
-                    "confidence": predicted_wr,
-                    "stats": stats,
-                    "reasoning": stats_str,
-                    "wr": predicted_wr * 100, 
-                    "delta": (predicted_wr - win_prob) * 100
-                }
-                
-                if enemy_champ > 0:
-                    key = f"{cid}_vs_{enemy_champ}"
-                    diff = self.lane_data.get(key)
-                    if diff: rec_data["diff"] = int(diff)
-                    
-                suggestions.append(rec_data)
-             
-             # Save to Cache
-             self.last_base_hash = current_base_hash
-             self.last_recs_cache = (suggestions, top_ids, top_visits)
+             # Save to Cache (by the caller, see _remember)
+             search['base_hash'] = current_base_hash
+             search['recs'] = (suggestions, top_ids, top_visits)
 
         elif cache_hit:
              suggestions = suggestions_cache
@@ -435,6 +678,11 @@ class DraftStrategist:
         else:
              # Target slot -1 or spectator
              suggestions = []
+             
+        search['ponder_job'] = ponder_job
+        search['prefetch_tasks'] = prefetch_tasks
+        search['cache_hit'] = cache_hit
+             
         lane_status = f"Lane: {my_pos}" if my_pos else "Observing"
         if enemy_champ > 0:
              ename = self.dd.get_id_map().get(enemy_champ, str(enemy_champ))
@@ -445,7 +693,7 @@ class DraftStrategist:
             "my_pos": my_pos,
             "my_champ_id": my_champ_id,
             "enemy_champ": enemy_champ,
-
+            "eval_cache": self.eval_cache.stats()
         }
         if my_champ_id > 0:
              # Calculate stats for the hover
@@ -487,7 +735,202 @@ class DraftStrategist:
                  "reasoning": f"AD: {h_stats['ad']:.0f}% AP: {h_stats['ap']:.0f}%"
              }
 
-        return suggestions, win_prob, lane_status, context
+        return (suggestions, win_prob, lane_status, context), search
+
+    def analyze_team(self, session, skill=6.0, patch=14.23, settings=None, mastery=None):
+        """
+        Team Recommendations: suggestion cards (same format as analyze) for every
+        open slot of our team. Safe to call from any thread (analysis_lock).
+        Search settings as in analyze, with these differences:
+        - search_mode "fast": every slot is scored one-ply (score_all), no search;
+        - otherwise one multi-root search (SpatialMCTS.search_multi) with the
+          latency of a single-slot search. It always builds MCTSNode roots
+          (search_tree "array" has no multi-root form) and runs in-process
+          (search_workers only parallelize the single-slot search, which would
+          otherwise take one full time budget per slot). Roots select by PUCT
+          even with root_policy "gumbel"; slots the Endgame Solver decides are
+          ranked by solved value.
+        Returns {cellId: suggestions_list}.
+        """
+        local_cell = session.get('localPlayerCellId', -1)
+        if not 0 <= local_cell <= 9: return {}
+        offset = 0 if local_cell < 5 else 5
+        
+        # Open ally slots: no completed pick (hovers/intents are still open)
+        locked = {a.get('actorCellId') for turn in session.get('actions', []) for a in turn
+                  if a.get('type') == 'pick' and a.get('completed', False)}
+        open_slots = [c for c in range(offset, offset + 5) if c not in locked]
+        if not open_slots: return {}
+        fast = bool(settings) and settings.get("search_mode", "mcts") == "fast"
+        
+        with self.analysis_lock:
+            # The model and EvalCache are ours until the end of this call
+            self.ponder.pause()
+            try:
+                t_inputs, _ = self.parse_lobby(session, skill, patch)
+                dev = self.brain.device
+                xp, xt, xb, xm, xmeta, x_times = t_inputs
+                xp, xt, xb, x_times = (t.to(dev).long() for t in (xp, xt, xb, x_times))
+                xm, xmeta = xm.to(dev).float(), xmeta.to(dev).float()
+                
+                mcts = SpatialMCTS(self.brain.runtime, self.fe, n_sims=50, batch_size=self.search_batch_size,
+                                   eval_cache=self.eval_cache, model_key=self.brain.checkpoint_id,
+                                   rollout_depth=self._rollout_depth(settings), widening=self._widening(settings),
+                                   root_policy=self._root_policy(settings),
+                                   endgame_budget=self._endgame_budget(session, settings))
+                win_prob = mcts.get_value((xp, xt, xb, xm, xmeta, x_times))
+                
+                xp_search = xp.clone()
+                for c in open_slots:
+                    xp_search[0][c] = 0
+                search_state = (xp_search, xt, xb, xm, xmeta, x_times)
+                
+                valid_actions = set(range(1, len(self.fe.vocab)))
+                valid_actions -= set(xp_search[0].cpu().tolist())
+                valid_actions -= set(xb[0].cpu().tolist())
+                
+                pick_order = self._pick_order(session)
+                if fast:
+                    roots = {c: mcts.score_all(search_state, c, valid_actions, pick_order=pick_order)
+                             for c in open_slots}
+                else:
+                    roots = mcts.search_multi(search_state, open_slots, valid_actions, pick_order=pick_order,
+                                              time_budget=self._search_budget(session, settings))
+                
+                team = {}
+                for cell, root in roots.items():
+                    enemy_champ = self._lane_opponent(session, cell)
+                    # Fast Mode / Endgame Solver rank by win chance of the picking side (see analyze)
+                    strength = (lambda node: node.prior) if (fast or root.solved) else None
+                    team[cell] = self._format_suggestions(root, xp, cell, offset, win_prob, enemy_champ,
+                                                          settings, mastery, strength=strength)[0]
+                return team
+            finally:
+                # Continue the background work analyze() left running (no analyze() can be mid-search here)
+                self.ponder.resume()
+
+    def _lane_opponent(self, session, cell):
+        """Champion of the enemy in the same assigned position as `cell` (mirror cell as fallback)."""
+        me = next((p for p in session.get('myTeam', []) if p.get('cellId') == cell), {})
+        pos = me.get('assignedPosition', '').upper()
+        mirror = (cell + 5) % 10
+        for p in session.get('theirTeam', []):
+            if pos and p.get('assignedPosition', '').upper() == pos:
+                return p.get('championId', 0)
+        for p in session.get('theirTeam', []):
+            if p.get('cellId') == mirror:
+                return p.get('championId', 0)
+        return 0
+
+    def _format_suggestions(self, root, xp, target_slot, offset, win_prob, enemy_champ, settings, mastery,
+                            strength=None):
+        """
+        Turns a search root into GUI suggestion cards for target_slot.
+        strength: node -> ranking score (default: visits).
+        Returns (suggestions, top_ids, top_visits).
+        """
+        strength = strength or (lambda node: node.visits)
+        # Default sort by visits
+        items = list(root.children.items())
+
+        # 1. Apply Mastery Bias
+        if mastery and settings:
+            bias = settings.get("mastery_bias", 1.0)
+            if abs(bias - 1.0) > 0.05:
+                m_map = {m['championId']: m['championPoints'] for m in mastery}
+                def score_func(x):
+                    cid, node = x
+                    raw_score = strength(node)
+                    pts = m_map.get(cid, 0)
+                    log_pts = math.log10(pts + 1) 
+                    factor = 1.0 + (log_pts * 0.2 * (bias - 1.0))
+                    return raw_score * factor
+                items.sort(key=score_func, reverse=True)
+            else:
+                items.sort(key=lambda x: strength(x[1]), reverse=True)
+        else:
+            items.sort(key=lambda x: strength(x[1]), reverse=True)
+
+        # 2. Apply Risk/Creativity
+        if settings:
+            risk = settings.get("risk_level", 0.0)
+            if risk > 0.1:
+                import random
+                candidates = items[:10]
+                rest = items[10:]
+
+                scored_candidates = []
+                for i, item in enumerate(candidates):
+                    base_score = float(len(candidates) - i)
+                    noise = random.uniform(-1.0, 1.0) * risk * 5.0
+                    scored_candidates.append((base_score + noise, item))
+
+                scored_candidates.sort(key=lambda x: x[0], reverse=True)
+                items = [x[1] for x in scored_candidates] + rest
+
+        sorted_children = items
+        top_ids = [a for a, n in sorted_children[:5]]
+        top_visits = [strength(n) for a, n in sorted_children[:5]]
+
+        # --- Format Suggestions & Cache ---
+        suggestions = []
+        max_v = top_visits[0] if top_visits else 1
+        if max_v == 0: max_v = 1
+
+        # Maps Token -> Real ID
+        inv_vocab = {v: k for k, v in self.fe.vocab.items()}
+
+        for i, token_id in enumerate(top_ids):
+           score = int((top_visits[i] / max_v) * 100)
+
+           # Convert Token to Real ID
+           real_id = inv_vocab.get(token_id, 0)
+           cid = real_id
+
+           name = self.dd.get_id_map().get(real_id, f"{real_id}")
+
+           # Resolve Asset ID (Name Key) using Real ID
+           asset_id = str(real_id)
+           for c_key, c_val in self.dd.champions.items():
+                if int(c_val['key']) == real_id:
+                     asset_id = c_key
+                     break
+
+           # AI Confidence
+           child_node = next((n for a, n in sorted_children if a == token_id), None)
+           predicted_wr = 0.5
+           if child_node:
+                if child_node.visits > 0:
+                    predicted_wr = child_node.value_sum / child_node.visits
+                else:
+                    predicted_wr = child_node.prior
+
+           # Stats
+           current_picks_sim = xp[0].cpu().tolist()
+           current_picks_sim[target_slot] = cid
+
+           team_slice = current_picks_sim[0:5] if (offset == 0) else current_picks_sim[5:10]
+           stats = self._calculate_team_stats(team_slice)
+           stats_str = f"AD: {stats['ad']:.0f}% AP: {stats['ap']:.0f}%"
+
+           rec_data = {
+               "id": str(asset_id),
+               "name": name,
+               "score": score,
+               "confidence": predicted_wr,
+               "stats": stats,
+               "reasoning": stats_str,
+               "wr": predicted_wr * 100, 
+               "delta": (predicted_wr - win_prob) * 100
+           }
+
+           if enemy_champ > 0:
+               key = f"{cid}_vs_{enemy_champ}"
+               diff = self.lane_data.get(key)
+               if diff: rec_data["diff"] = int(diff)
+
+           suggestions.append(rec_data)
+        return suggestions, top_ids, top_visits
 
     def _calculate_team_stats(self, team_ids):
         total_ad = 0
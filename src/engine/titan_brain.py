@@ -1,12 +1,21 @@
 import torch
 import torch.nn as nn
+import torch.nn.functional as F
 import torch.optim as optim
 import numpy as np
+import copy
 import os
+from src.engine.checkpoint import (ARCHIVE_EXT, CheckpointError, archive_path, check_tensors, load_tensors,
+                                   read_header, write_archive)
 
 # Central constant — must match training checkpoint
 VOCAB_SIZE = 3000
 
+# ONNX Export: graph input/output names (forward() arguments and outputs, in order)
+ONNX_INPUTS = ["x_picks", "x_turns", "x_bans", "x_mast", "x_meta", "x_times"]
+ONNX_OUTPUTS = ["policy", "value", "sort_indices", "times"]
+ONNX_OPSET = 17
+
 class TitanNet(nn.Module):
         """
         TitanNet V3.5: The God Schema Model (Audited).
@@ -33,6 +42,8 @@ class TitanNet(nn.Module):
             super(TitanNet, self).__init__()
             
             self.d_model = d_model
+            # Constructor arguments, to rebuild the same architecture elsewhere (workers, exports)
+            self.config = {"vocab_size": vocab_size, "d_model": d_model, "nhead": nhead, "num_layers": num_layers}
             
             # --- Embeddings & Encoders ---
             
@@ -88,9 +99,14 @@ class TitanNet(nn.Module):
                 nn.Sigmoid()
             )
             
-        def _get_schedule(self, B, device, mode="SOLO"):
+            # --- Inference Encoder (eval mode) ---
+            # SDPA layer loop with batched sort/mask build (no parameters: checkpoints unchanged).
+            # Opt-in: agrees with nn.TransformerEncoder to float rounding, not bit for bit
+            self.sdpa_encoder = False
+            
+        def _get_schedule(self, x_times, mode="SOLO"):
             """
-            Returns time indices for Bans and offsets for Picks.
+            Returns (ban times [B, 10], pick times [B, 10]) on the global time axis.
             
             SOLO (Default):
             - Bans 1-10 (Times 1-10)
@@ -102,43 +118,25 @@ class TitanNet(nn.Module):
             - Bans 7-10 (Times 13-16)
             - Picks 7-10 (Times 17-20)
             """
-            t_bans = torch.zeros((B, 10), device=device)
-            pick_offset_func = None
+            B = x_times.size(0)
+            device = x_times.device
+            x_times = x_times.long()
             
             if mode == "TOURNAMENT":
-                 # Phase 1
-                 t_bans[:, 0:6] = torch.arange(1, 7, device=device)
-                 # Phase 2
-                 t_bans[:, 6:10] = torch.arange(13, 17, device=device)
-                 
-                 def tournament_offset(pick_times):
-                      # pick_times input is 1..10
-                      pt = pick_times.float()
-                      mask_p2 = (pt > 6)
-                      pt[~mask_p2] += 6.0   # 1..6 -> 7..12
-                      pt[mask_p2] += 10.0   # 7..10 -> 17..20
-                      return pt.long()
-                 pick_offset_func = tournament_offset
-                 
+                 t_bans = torch.cat([torch.arange(1, 7, device=device), torch.arange(13, 17, device=device)]).expand(B, 10)
+                 # 1..6 -> 7..12, 7..10 -> 17..20
+                 t_picks = torch.where(x_times > 6, x_times + 10, x_times + 6)
             else: # SOLO (Ranked)
                  t_bans = torch.arange(1, 11, device=device).expand(B, 10)
+                 # Input 1..10 -> Output 11..20
+                 t_picks = x_times + 10
                  
-                 def solo_offset(pick_times):
-                      # Input 1..10 -> Output 11..20
-                      return pick_times.long() + 10
-                 pick_offset_func = solo_offset
-                 
-            return t_bans, pick_offset_func
+            return t_bans, t_picks
 
-        def forward(self, x_picks, x_turns, x_bans, x_mast, x_meta, x_times=None, src_mask=None, mode="SOLO"):
+        def _embed(self, x_picks, x_turns, x_bans, x_mast, x_meta, x_times=None, mode="SOLO"):
             """
-            x_picks: [B, 10] (Int) - Champion IDs
-            x_turns: [B, 10] (Int) - Spatial Seat IDs (1-10)
-            x_bans:  [B, 10] (Int)
-            x_mast:  [B, 10] (Float)
-            x_meta:  [B, 3]  (Float)
-            x_times: [B, 10] (Int) - Pick Order (1..10)
-            mode:    "SOLO" (Default) or "TOURNAMENT"
+            Token features in raw order [Meta, Bans 1-10, Picks 1-10].
+            Returns (raw_seq [B, 21, D], all_times [B, 21], raw_pad [B, 21]).
             """
             B = x_picks.size(0)
             device = x_picks.device
@@ -149,11 +147,7 @@ class TitanNet(nn.Module):
             if x_times is None:
                  x_times = torch.arange(1, 11, device=device).expand(B, 10) # 1..10 input
                  
-            ban_times, pick_map_func = self._get_schedule(B, device, mode=mode)
-            
-            # Apply mapping to Pick Times
-            # We clone to avoid modifying input tensor in place if it's reused
-            pick_times_global = pick_map_func(x_times.clone())
+            ban_times, pick_times_global = self._get_schedule(x_times, mode=mode)
             
             # 2. Player Features
             e_picks_id = self.champ_embedding(x_picks) 
@@ -173,14 +167,55 @@ class TitanNet(nn.Module):
             e_meta_pos = self.pos_embedding(torch.zeros((B, 1), dtype=torch.long, device=device))
             meta_feat = meta_feat + e_meta_pos
             
-            # --- Physical Sorting (Interleaving) ---
             raw_seq = torch.cat([meta_feat, ban_feats, player_feats], dim=1) # [B, 21, D]
             
             t_meta = torch.zeros((B, 1), device=device)
             t_bans = ban_times
             t_picks = pick_times_global.float()
-            
             all_times = torch.cat([t_meta, t_bans.float(), t_picks], dim=1) # [B, 21]
+            
+            # --- Padding Mask (Raw Order) ---
+            mask_meta = torch.zeros((B, 1), dtype=torch.bool, device=device)
+            mask_bans = (x_bans == 0) 
+            mask_picks = (x_picks == 0) 
+            raw_pad = torch.cat([mask_meta, mask_bans, mask_picks], dim=1)
+            return raw_seq, all_times, raw_pad
+            
+        def forward(self, x_picks, x_turns, x_bans, x_mast, x_meta, x_times=None, src_mask=None, mode="SOLO"):
+            """
+            x_picks: [B, 10] (Int) - Champion IDs
+            x_turns: [B, 10] (Int) - Spatial Seat IDs (1-10)
+            x_bans:  [B, 10] (Int)
+            x_mast:  [B, 10] (Float)
+            x_meta:  [B, 3]  (Float)
+            x_times: [B, 10] (Int) - Pick Order (1..10)
+            mode:    "SOLO" (Default) or "TOURNAMENT"
+            """
+            x_trans, sort_indices, sorted_times = self.encode(x_picks, x_turns, x_bans, x_mast, x_meta, x_times, src_mask, mode)
+            return self._heads(x_trans, sort_indices, sorted_times)
+            
+        def encode(self, x_picks, x_turns, x_bans, x_mast, x_meta, x_times=None, src_mask=None, mode="SOLO"):
+            """
+            Embeddings + Transformer, without the heads (same inputs as forward).
+            Returns (x_trans [B, 21, D] in sorted order, sort_indices, sorted_times).
+            
+            Inference Encoder: in eval mode (SOLO, no src_mask, sdpa_encoder) the
+            layers run as an SDPA loop over the same weights, with one boolean
+            visibility mask per board instead of the per-head float mask (tied
+            times are ordered stably). Accepted deviation: another summation
+            order, so outputs differ from the default path by float rounding
+            (policy logits within 1e-5, values within 1e-6).
+            """
+            raw_seq, all_times, raw_pad = self._embed(x_picks, x_turns, x_bans, x_mast, x_meta, x_times, mode)
+            if self.sdpa_encoder and not self.training and src_mask is None and mode == "SOLO":
+                sort_indices, causal = self._time_masks(all_times)
+                x = torch.gather(raw_seq, 1, sort_indices.unsqueeze(-1).expand_as(raw_seq))
+                visible = causal & ~torch.gather(raw_pad, 1, sort_indices).unsqueeze(1)
+                for layer in self.transformer.layers:
+                    x, _, _ = self._layer_step(layer, x, None, None, visible)
+                return x, sort_indices, torch.gather(all_times, 1, sort_indices)
+            
+            # --- Physical Sorting (Interleaving) ---
             sort_indices = torch.argsort(all_times, dim=1)
             
             idx_expanded = sort_indices.unsqueeze(-1).expand_as(raw_seq)
@@ -197,16 +232,14 @@ class TitanNet(nn.Module):
                  src_mask = causal_mask.repeat_interleave(8, dim=0)
 
             # --- Padding Mask (Reordered) ---
-            mask_meta = torch.zeros((B, 1), dtype=torch.bool, device=device)
-            mask_bans = (x_bans == 0) 
-            mask_picks = (x_picks == 0) 
-            raw_pad = torch.cat([mask_meta, mask_bans, mask_picks], dim=1)
             sorted_pad = torch.gather(raw_pad, 1, sort_indices)
 
             # --- Transformer Pass ---
             x_trans = self.transformer(x_sorted, mask=src_mask, src_key_padding_mask=sorted_pad)
+            return x_trans, sort_indices, sorted_times
             
-            # --- Heads ---
+        def _heads(self, x_trans, sort_indices, sorted_times):
+            """Policy and Value Heads on the encoded sequence [B, 21, D] (sorted order)."""
             # 1. Policy Head
             policy_input = x_trans[:, :-1, :] 
             policy_logits = self.policy_head(policy_input) # [B, 20, Vocab], Sorted Order!
@@ -221,20 +254,313 @@ class TitanNet(nn.Module):
                 'sort_indices': sort_indices,
                 'times': sorted_times
             }
+            
+        # --- Inference Entry Points (on encode() / encode_incremental() outputs) ---
+        
+        def predict_value(self, encoded):
+            """Value Head only: blue win probability [B]. The Policy Head is skipped."""
+            return self.value_head(encoded[0][:, -1, :])[:, 0]
+            
+        def predict_rows(self, encoded, slots):
+            """
+            Policy Head on one position per board: the row predicting slots[b]
+            (the output of the token just before slot 11 + slots[b] in sorted
+            order). slots: [B] long, -1 = any row (full boards, ignored by callers).
+            Returns (logits [B, Vocab], value [B]).
+            """
+            x_trans, sort_indices, _ = encoded
+            target = (slots.clamp(min=-1) + 11).unsqueeze(1)
+            pos = (sort_indices == target).long().argmax(dim=1)
+            rows = (pos - 1).clamp(min=0)
+            h = x_trans[torch.arange(x_trans.size(0), device=x_trans.device), rows]
+            return self.policy_head(h), self.predict_value(encoded)
+            
+        def _time_masks(self, all_times):
+            """
+            Sort indices [B, 21] and causal visibility [B, 21, 21] (sorted order,
+            True = token j visible to token i) for all_times, built for the whole
+            batch in one sort (no per-board Python work).
+            """
+            if torch.jit.is_tracing() or torch.onnx.is_in_onnx_export():
+                # Exports: ties are broken by raw position in the key, so a plain
+                # sort is stable (ONNX has no stable sort)
+                position = torch.arange(all_times.size(1), device=all_times.device, dtype=all_times.dtype)
+                sort = torch.argsort(all_times * 32 + position, dim=1)
+                t = torch.gather(all_times, 1, sort)
+            else:
+                t, sort = torch.sort(all_times, dim=1, stable=True)
+            return sort, t.unsqueeze(1) <= t.unsqueeze(2)
+            
+        # --- Incremental Inference (Prefix KV-Cache) ---
+        
+        def _layer_step(self, layer, x, keys, values, visible):
+            """
+            One pre-norm encoder layer (eval mode) for the queries x [B, Q, D],
+            attending to keys/values [B, K, D] where visible [B, Q, K] is True.
+            Returns (x after the layer, this layer's own keys, values).
+            """
+            attn = layer.self_attn
+            h = layer.norm1(x)
+            # INT8 models carry the attention projections as (quantized) Linear modules
+            qkv_proj = getattr(layer, 'qkv_proj', None)
+            if qkv_proj is not None:
+                q, k, v = qkv_proj(h).chunk(3, dim=-1)
+                out_proj = layer.attn_out
+            else:
+                q, k, v = F.linear(h, attn.in_proj_weight, attn.in_proj_bias).chunk(3, dim=-1)
+                out_proj = attn.out_proj
+            keys = k if keys is None else torch.cat([keys, k], dim=1)
+            values = v if values is None else torch.cat([values, v], dim=1)
+            
+            B, Q, D = q.shape
+            H = attn.num_heads
+            heads = lambda t: t.view(B, t.size(1), H, D // H).transpose(1, 2)
+            out = F.scaled_dot_product_attention(heads(q), heads(keys), heads(values), attn_mask=visible.unsqueeze(1))
+            out = out_proj(out.transpose(1, 2).reshape(B, Q, D))
+            
+            x = x + out
+            x = x + layer.linear2(layer.activation(layer.linear1(layer.norm2(x))))
+            return x, k, v
+            
+        def build_prefix(self, x_picks, x_turns, x_bans, x_mast, x_meta, x_times):
+            """
+            Encodes one board (B=1) and keeps, per layer, the keys/values of its
+            tokens plus their final hidden states (raw order). Boards that only
+            add picks at later times than all of its tokens can then be encoded
+            with forward_incremental(), which computes the added tokens only.
+            """
+            raw_seq, all_times, raw_pad = self._embed(x_picks, x_turns, x_bans, x_mast, x_meta, x_times)
+            # Causal (by time, so raw order works) + Padding
+            visible = (all_times.unsqueeze(1) <= all_times.unsqueeze(2)) & ~raw_pad.unsqueeze(1)
+            
+            x, keys, values = raw_seq, [], []
+            for layer in self.transformer.layers:
+                x, k, v = self._layer_step(layer, x, None, None, visible)
+                keys.append(k)
+                values.append(v)
+            return {
+                'inputs': (x_picks, x_turns, x_bans, x_mast, x_meta, x_times),
+                'keys': keys,
+                'values': values,
+                'hidden': x,
+                'visible': ~raw_pad, # Every prefix token is older than any added pick
+            }
+            
+        def forward_incremental(self, prefix, x_picks, x_times):
+            """
+            Same outputs as forward() for boards [N, 10] that extend the prefix
+            board: its picks and times kept, empty slots filled at times later
+            than every prefix time, all distinct (what search moves do). The
+            caller checks this. Inference only (eval mode, SOLO schedule).
+            """
+            x_trans, sort_indices, sorted_times = self.encode_incremental(prefix, x_picks, x_times)
+            return self._heads(x_trans, sort_indices, sorted_times)
+            
+        def encode_incremental(self, prefix, x_picks, x_times):
+            """encode() through the Prefix KV-Cache (see forward_incremental)."""
+            N = x_picks.size(0)
+            _, x_turns, x_bans, x_mast, x_meta, _ = prefix['inputs']
+            x_turns, x_bans, x_mast, x_meta = (t.expand(N, -1) for t in (x_turns, x_bans, x_mast, x_meta))
+            raw_seq, all_times, _ = self._embed(x_picks, x_turns, x_bans, x_mast, x_meta, x_times)
+            hidden = prefix['hidden'].expand(N, -1, -1).clone()
+            
+            # Added picks in time order (padded to the longest; invalid rows point at other slots)
+            added = (prefix['inputs'][0] == 0) & (x_picks != 0) # [N, 10]
+            A = int(added.sum(dim=1).max().item()) if N else 0
+            if A > 0:
+                t_picks = all_times[:, 11:]
+                order = torch.argsort(torch.where(added, t_picks, t_picks + 1e4), dim=1)[:, :A]
+                valid = torch.gather(added, 1, order)
+                idx = (order + 11).unsqueeze(-1).expand(-1, -1, raw_seq.size(-1))
+                x = torch.gather(raw_seq, 1, idx)
+                t_new = torch.gather(t_picks, 1, order)
+                
+                # Queries: the added tokens. Keys: visible prefix tokens + earlier/equal added ones
+                see_new = (t_new.unsqueeze(1) <= t_new.unsqueeze(2)) & valid.unsqueeze(1)
+                see_old = prefix['visible'].unsqueeze(1).expand(N, A, -1)
+                visible = torch.cat([see_old, see_new], dim=2)
+                for layer, k_old, v_old in zip(self.transformer.layers, prefix['keys'], prefix['values']):
+                    x, _, _ = self._layer_step(layer, x, k_old.expand(N, -1, -1), v_old.expand(N, -1, -1), visible)
+                    
+                # Invalid rows write back the hidden state already there
+                x = torch.where(valid.unsqueeze(-1), x, torch.gather(hidden, 1, idx))
+                hidden.scatter_(1, idx, x)
+                
+            sort_indices = torch.argsort(all_times, dim=1, stable=True)
+            x_trans = torch.gather(hidden, 1, sort_indices.unsqueeze(-1).expand_as(hidden))
+            return x_trans, sort_indices, torch.gather(all_times, 1, sort_indices)
+
+def example_inputs(batch_size=1, device="cpu"):
+    """A representative mid-draft batch (4 picks, 10 bans) for exports and warmup."""
+    picks = torch.zeros((batch_size, 10), dtype=torch.long, device=device)
+    picks[:, [0, 5, 6, 1]] = torch.tensor([1, 2, 3, 4], device=device)
+    return (
+        picks,
+        torch.arange(1, 11, device=device).expand(batch_size, 10).contiguous(),
+        torch.arange(11, 21, device=device).expand(batch_size, 10).contiguous(),
+        torch.zeros((batch_size, 10), device=device),
+        torch.tensor([[6.0, 14.23, 0.0]], device=device).expand(batch_size, 3).contiguous(),
+        torch.tensor([[1, 4, 5, 8, 9, 2, 3, 6, 7, 10]], device=device).expand(batch_size, 10).contiguous(),
+    )
+
+def compact_path(model_path, vocab_size):
+    """Vocab-sliced copy of a checkpoint (titan_v3_best.pt -> titan_v3_best_v171.pt, src/tools/slice_vocab.py)."""
+    return os.path.splitext(model_path)[0] + f"_v{vocab_size}.pt"
+
+def scripted_path(model_path):
+    """TorchScript artifact next to a checkpoint (titan_v3_best.pt -> titan_v3_best.ts)."""
+    return os.path.splitext(model_path)[0] + ".ts"
+
+def export_torchscript(model, path, batch_size=8):
+    """
+    Traces the inference entry points of TitanNet (forward, encode,
+    predict_value, predict_rows) in eval mode into one TorchScript module and
+    saves it to path. Inputs are positional (no keywords in traced methods).
+    The Prefix KV-Cache entry points (build_prefix, *_incremental) take a
+    variable-length per-layer cache and are not traced, so searches on the
+    artifact evaluate every batch in full (see TitanBrain._report_prefix_cache).
+    """
+    model.eval()
+    device = next(model.parameters()).device
+    with torch.no_grad():
+        inputs = example_inputs(batch_size, device)
+        encoded = model.encode(*inputs)
+        slots = torch.full((batch_size,), 4, dtype=torch.long, device=device)
+        traced = torch.jit.trace_module(model, {
+            'forward': inputs,
+            'encode': inputs,
+            'predict_value': (encoded,),
+            'predict_rows': (encoded, slots),
+        }, strict=False)
+    torch.jit.save(traced, path)
+    return traced
+
+def onnx_path(model_path):
+    """ONNX artifact next to a checkpoint (titan_v3_best.pt -> titan_v3_best.onnx)."""
+    return os.path.splitext(model_path)[0] + ".onnx"
+
+def export_onnx(model, path, batch_size=8):
+    """
+    Exports TitanNet.forward() (eval mode: time sorting and causal masking
+    included in the graph) to ONNX with a dynamic batch axis.
+    """
+    model.eval()
+    device = next(model.parameters()).device
+    with torch.no_grad():
+        torch.onnx.export(
+            model, example_inputs(batch_size, device), path,
+            input_names=ONNX_INPUTS,
+            output_names=ONNX_OUTPUTS,
+            dynamic_axes={name: {0: "batch"} for name in ONNX_INPUTS + ONNX_OUTPUTS},
+            opset_version=ONNX_OPSET,
+        )
+
+class OnnxTitanRuntime:
+    """
+    TitanNet forward() through an onnxruntime CPU session (settings:
+    inference_backend = "onnx"). Same positional inputs and output dict as the
+    torch model, as CPU tensors, so SpatialMCTS uses it like any other runtime
+    (full forward, rows picked on the host).
+    """
+    def __init__(self, path):
+        import onnxruntime as ort # Optional dependency: only needed for this backend
+        self.path = path
+        self.session = ort.InferenceSession(path, providers=["CPUExecutionProvider"])
+        self.device = torch.device("cpu")
+        
+    def eval(self):
+        return self
+        
+    def __call__(self, x_picks, x_turns, x_bans, x_mast, x_meta, x_times=None):
+        if x_times is None:
+            x_times = torch.arange(1, 11).expand(x_picks.size(0), 10)
+        feed = {
+            "x_picks": x_picks.cpu().long().numpy(),
+            "x_turns": x_turns.cpu().long().numpy(),
+            "x_bans": x_bans.cpu().long().numpy(),
+            "x_mast": x_mast.cpu().float().numpy(),
+            "x_meta": x_meta.cpu().float().numpy(),
+            "x_times": x_times.cpu().long().numpy(),
+        }
+        outputs = self.session.run(ONNX_OUTPUTS, feed)
+        return {name: torch.from_numpy(out) for name, out in zip(ONNX_OUTPUTS, outputs)}
+
+def quantized_path(model_path):
+    """INT8 TorchScript artifact next to a checkpoint (titan_v3_best.pt -> titan_v3_best.int8.ts)."""
+    return os.path.splitext(model_path)[0] + ".int8.ts"
+
+def quantize_int8(model):
+    """
+    Dynamic INT8 copy of TitanNet for CPU inference: int8 weights, activations
+    quantized per call, for every nn.Linear (encoders, feed-forward, heads) and
+    the attention projections. Those are first split out of
+    nn.MultiheadAttention as Linear modules, which the inference encoder
+    (_layer_step) uses when present. The original model is left untouched.
+    """
+    q = copy.deepcopy(model).cpu().eval()
+    for layer in q.transformer.layers:
+        attn = layer.self_attn
+        d = attn.embed_dim
+        layer.qkv_proj = nn.Linear(d, 3 * d)
+        layer.qkv_proj.weight.data.copy_(attn.in_proj_weight.data)
+        layer.qkv_proj.bias.data.copy_(attn.in_proj_bias.data)
+        layer.attn_out = nn.Linear(d, d)
+        layer.attn_out.weight.data.copy_(attn.out_proj.weight.data)
+        layer.attn_out.bias.data.copy_(attn.out_proj.bias.data)
+    return torch.ao.quantization.quantize_dynamic(q, {nn.Linear}, dtype=torch.qint8)
+
+def pack_checkpoint(model):
+    """Checkpoint payload: the state dict plus the constructor arguments (vocab_size included)."""
+    return {"state_dict": model.state_dict(), "config": dict(model.config)}
+
+def unpack_checkpoint(payload):
+    """
+    (state_dict, config) of a checkpoint payload. Plain state dicts (older
+    checkpoints) carry no config: their vocab_size is read off the embedding.
+    """
+    if "state_dict" in payload:
+        return payload["state_dict"], dict(payload.get("config", {}))
+    return payload, {"vocab_size": payload["champ_embedding.weight"].size(0)}
+
+def slice_vocab(state_dict, vocab_size):
+    """
+    State dict with the vocab-sized tensors (champion embedding, policy output
+    layer) cut to the first vocab_size tokens. Logits of the kept tokens are
+    unchanged; every other weight is shared.
+    """
+    out = dict(state_dict)
+    for key in ("champ_embedding.weight", "policy_head.3.weight", "policy_head.3.bias"):
+        out[key] = state_dict[key][:vocab_size].clone()
+    return out
 
 class TitanBrain:
     def __init__(self, model_path="titan_v3.pt"):
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         self.model = None
+        # Module used for inference: self.model, or an exported artifact of it (see load)
+        self.runtime = None
         self.model_path = model_path
         self.optimizer = None
         self.loaded_successfully = False
+        # Identifies the weights currently in self.model (used to key evaluation caches)
+        self.checkpoint_id = None
+        # Header metadata of a loaded archive (vocab map, training data hash)
+        self.metadata = {}
         
     def initialize(self, vocab_size=VOCAB_SIZE):
         print(f"[TITAN] Initializing V3 Architecture... Device: {self.device}")
-        self.model = TitanNet(vocab_size=vocab_size).to(self.device)
+        self._build(TitanNet(vocab_size=vocab_size))
+        self.checkpoint_id = f"random:{id(self.model)}"
+        
+    def _build(self, model):
+        self.model = model.to(self.device)
+        self.runtime = self.model
         self.optimizer = optim.AdamW(self.model.parameters(), lr=0.0005, weight_decay=1e-5)
         
+    @property
+    def vocab_size(self):
+        return self.model.config["vocab_size"] if self.model else 0
+        
     def train_step(self, x_picks, x_turns, x_bans, x_mast, x_meta, y_win, src_mask=None, y_policy=None, x_times=None):
         if not self.model: return 0.0, 0.0
         
@@ -281,21 +607,149 @@ class TitanBrain:
 
     def save(self):
         if self.model:
-            torch.save(self.model.state_dict(), self.model_path)
-            
-    def load(self):
+            torch.save(pack_checkpoint(self.model), self.model_path)
+            
+    def save_archive(self, path=None, vocab=None, data_hash=None):
+        """Writes self.model as a flat archive (checkpoint.py) with its architecture, vocab map and training data hash."""
+        metadata = {
+            "config": dict(self.model.config),
+            "vocab": {str(cid): int(tok) for cid, tok in (vocab or {}).items()},
+            "data_hash": data_hash,
+        }
+        path = path or archive_path(self.model_path)
+        write_archive(path, self.model.state_dict(), metadata)
+        return path
+            
+    def load(self, prefer_scripted=True, precision="fp32", backend="torch", sdpa_encoder=False):
+        """
+        Loads the checkpoint into self.model, rebuilt first if the checkpoint
+        records other constructor arguments (e.g. a compact vocab from
+        src/tools/slice_vocab.py). With prefer_scripted, inference
+        (self.runtime) uses the TorchScript artifact next to it if one exists
+        that is not older than the checkpoint (src/tools/export_torchscript.py).
+        precision="int8": dynamic INT8 runtime on CPU, from the .int8.ts artifact
+        (src/tools/quantize_titan.py) or quantized at load.
+        backend="onnx": onnxruntime CPU session on the .onnx artifact
+        (src/tools/export_onnx.py); falls back to torch if it is missing or stale.
+        A .titan archive (src/tools/convert_checkpoint.py) is checked against
+        its header before any weight is read, then memory-mapped.
+        sdpa_encoder: eval-mode SDPA encoder in the eager model (TitanNet.encode).
+        """
+        self.metadata = {} # Only archives carry a header; never keep a previous one
         if not os.path.exists(self.model_path):
             print(f"[TITAN] Checkpoint not found: {self.model_path}")
             return False
         try:
-            # weights_only=True to fix Security Warning
-            state_dict = torch.load(self.model_path, map_location=self.device, weights_only=True)
-            self.model.load_state_dict(state_dict)
+            if self.model_path.endswith(ARCHIVE_EXT):
+                self._load_archive()
+            else:
+                # weights_only=True to fix Security Warning
+                payload = torch.load(self.model_path, map_location=self.device, weights_only=True)
+                state_dict, config = unpack_checkpoint(payload)
+                config = {**self.model.config, **config}
+                if config != self.model.config:
+                    print(f"[TITAN] Checkpoint architecture: {config}")
+                    self._build(TitanNet(**config))
+                self.model.load_state_dict(state_dict)
+            self.model.sdpa_encoder = sdpa_encoder
             self.loaded_successfully = True
+            st = os.stat(self.model_path)
+            self.checkpoint_id = f"{os.path.abspath(self.model_path)}:{st.st_size}:{st.st_mtime_ns}"
+            self.runtime = self.model
+            if not (backend == "onnx" and self._load_onnx(onnx_path(self.model_path))):
+                if precision == "int8":
+                    self._load_int8(prefer_scripted)
+                elif prefer_scripted:
+                    self._load_scripted(scripted_path(self.model_path))
+            self._report_prefix_cache()
             return True
+        except CheckpointError as e:
+            print(f"[TITAN] ERROR: Checkpoint rejected: {e}")
+            return False
         except RuntimeError as e:
             print(f"[TITAN] ERROR: Model load failed (shape mismatch?): {e}")
             return False
         except Exception as e:
             print(f"[TITAN] ERROR: Unexpected load failure: {e}")
             return False
+
+    def _load_archive(self):
+        header = read_header(self.model_path)
+        config = header["metadata"]["config"]
+        with torch.device("meta"): # No random init: every tensor comes from the archive
+            model = TitanNet(**config)
+        check_tensors(header, model.state_dict())
+        # Parameters become views of the memory map (copied only when moved to another device)
+        model.load_state_dict(load_tensors(self.model_path, header), assign=True)
+        self._build(model)
+        self.metadata = header["metadata"]
+
+    def _load_int8(self, prefer_scripted):
+        if self.device.type != "cpu":
+            print("[TITAN] WARNING: INT8 inference is CPU-only. Using fp32.")
+            return False
+        if not (prefer_scripted and self._load_scripted(quantized_path(self.model_path))):
+            self.runtime = quantize_int8(self.model)
+        # Different outputs: keep evaluation caches apart from the fp32 model
+        self.checkpoint_id += ":int8"
+        return True
+
+    def _load_onnx(self, path):
+        if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(self.model_path):
+            print(f"[TITAN] WARNING: No current ONNX artifact at {path}. Using torch.")
+            return False
+        try:
+            self.runtime = OnnxTitanRuntime(path)
+        except Exception as e:
+            print(f"[TITAN] WARNING: ONNX backend unavailable ({e}). Using torch.")
+            return False
+        # Float differences vs torch: keep evaluation caches apart
+        self.checkpoint_id += ":onnx"
+        print(f"[TITAN] Inference Backend: onnxruntime ({path})")
+        return True
+
+    def _load_scripted(self, path):
+        if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(self.model_path):
+            return False
+        try:
+            self.runtime = torch.jit.load(path, map_location=self.device)
+            self.runtime.eval()
+            print(f"[TITAN] Inference Artifact: {path}")
+            return True
+        except Exception as e:
+            print(f"[TITAN] WARNING: TorchScript artifact unusable ({e}). Using eager model.")
+            self.runtime = self.model
+            return False
+
+    def _report_prefix_cache(self):
+        """
+        The Prefix KV-Cache runs only on runtimes with the incremental entry
+        points (eager fp32 or INT8-at-load). Serving prefix batches of an
+        artifact from the eager model instead would put results of two models
+        under one EvalCache key, so artifacts trade the cache for their faster
+        full passes.
+        """
+        if hasattr(self.runtime, 'forward_incremental'):
+            print("[TITAN] Prefix KV-Cache: on")
+        else:
+            print("[TITAN] Prefix KV-Cache: off (exported runtime, full passes only)")
+
+    def warmup(self, batch_sizes=(1,)):
+        """
+        Runs the inference entry points on representative batches, so one-time
+        costs (TorchScript profiling/optimization, allocator growth) are paid at
+        startup instead of in the first draft.
+        """
+        if self.runtime is None: return
+        self.runtime.eval()
+        device = "cpu" if isinstance(self.runtime, OnnxTitanRuntime) else self.device
+        with torch.no_grad():
+            for b in dict.fromkeys(batch_sizes):
+                inputs = example_inputs(b, device)
+                slots = torch.full((b,), 4, dtype=torch.long, device=device)
+                for _ in range(2): # The profiling executor optimizes on the second run
+                    self.runtime(*inputs)
+                    if hasattr(self.runtime, 'predict_rows'):
+                        encoded = self.runtime.encode(*inputs)
+                        self.runtime.predict_value(encoded)
+                        self.runtime.predict_rows(encoded, slots)
@@ -0,0 +1,86 @@
+import unittest
+import tempfile
+import torch
+import sys
+import os
+
+# Add src to path (Up 2 levels from tests/)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from src.engine.titan_brain import TitanBrain, TitanNet, example_inputs
+from src.engine.checkpoint import CheckpointError, check_tensors, check_vocab, read_header, write_archive
+
+VOCAB = 60
+
+class TestCheckpointArchive(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.brain = TitanBrain(os.path.join(self.tmp.name, "titan.pt"))
+        self.brain.device = torch.device("cpu")
+        self.brain.initialize(vocab_size=VOCAB)
+        self.brain.model.eval()
+        self.vocab = {266: 1, 103: 2, 84: 3}
+        self.path = self.brain.save_archive(vocab=self.vocab, data_hash="abc123")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip(self):
+        """The archive loads (no prior initialize) to the same model, with its metadata."""
+        brain = TitanBrain(self.path)
+        brain.device = torch.device("cpu")
+        self.assertTrue(brain.load(prefer_scripted=False))
+        self.assertEqual(brain.vocab_size, VOCAB)
+        self.assertEqual(brain.metadata["data_hash"], "abc123")
+        self.assertEqual(brain.metadata["vocab"]["266"], 1)
+
+        # Loading a plain checkpoint afterwards drops the archive's metadata
+        brain.model_path = os.path.join(self.tmp.name, "titan.pt")
+        torch.save(self.brain.model.state_dict(), brain.model_path)
+        self.assertTrue(brain.load(prefer_scripted=False))
+        self.assertEqual(brain.metadata, {})
+        brain.model_path = self.path
+        self.assertTrue(brain.load(prefer_scripted=False))
+
+        brain.model.eval()
+        inputs = example_inputs(2)
+        with torch.no_grad():
+            ref = self.brain.model(*inputs)
+            got = brain.model(*inputs)
+        self.assertTrue(torch.equal(got['policy'], ref['policy']))
+        self.assertTrue(torch.equal(got['value'], ref['value']))
+
+    def test_header_only_checks(self):
+        header = read_header(self.path)
+        self.assertEqual(header["metadata"]["config"]["vocab_size"], VOCAB)
+
+        # Architecture mismatch is caught from the header (no weights needed)
+        with torch.device("meta"):
+            other = TitanNet(vocab_size=VOCAB, num_layers=2)
+        with self.assertRaises(CheckpointError):
+            check_tensors(header, other.state_dict())
+
+        # Live vocab: same tokens pass, moved champions or uncovered tokens are rejected
+        check_vocab(header, {266: 1, 103: 2, 84: 3, 1: 4})
+        with self.assertRaises(CheckpointError):
+            check_vocab(header, {266: 2, 103: 1})
+        with self.assertRaises(CheckpointError):
+            check_vocab(header, {266: 1, 999: VOCAB})
+
+    def test_rejects_bad_archives(self):
+        bad = os.path.join(self.tmp.name, "bad.titan")
+        with open(bad, "wb") as f:
+            f.write(b"not an archive")
+        with self.assertRaises(CheckpointError):
+            read_header(bad)
+
+        # Header disagrees with the architecture it records: load() fails cleanly
+        state_dict = self.brain.model.state_dict()
+        del state_dict["value_head.2.bias"]
+        write_archive(bad, state_dict, {"config": dict(self.brain.model.config)})
+        brain = TitanBrain(bad)
+        brain.device = torch.device("cpu")
+        self.assertFalse(brain.load(prefer_scripted=False))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+import sys
+import os
+
+# Add src to path (Up 2 levels from tests/)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from src.engine.eval_cache import EvalCache, ENTRY_OVERHEAD_BYTES
+
+class FakeRow:
+    """Stands in for a numpy logits row (only nbytes is read)."""
+    def __init__(self, nbytes):
+        self.nbytes = nbytes
+
+class TestEvalCache(unittest.TestCase):
+    def test_hit_miss_counters(self):
+        cache = EvalCache()
+        self.assertIsNone(cache.get(("ckpt", 1)))
+        cache.put(("ckpt", 1), None, 0.6)
+        self.assertEqual(cache.get(("ckpt", 1)), (None, 0.6))
+
+        # Same board under another checkpoint is a different entry
+        self.assertIsNone(cache.get(("other", 1)))
+
+        stats = cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 2)
+        self.assertAlmostEqual(stats["hit_rate"], 1 / 3)
+
+    def test_lru_entry_limit(self):
+        cache = EvalCache(max_entries=2)
+        cache.put("a", None, 0.1)
+        cache.put("b", None, 0.2)
+        cache.get("a") # 'b' is now least recently used
+        cache.put("c", None, 0.3)
+
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+        self.assertIn("c", cache)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_memory_limit(self):
+        row_bytes = 12000
+        cache = EvalCache(max_bytes=3 * (row_bytes + ENTRY_OVERHEAD_BYTES))
+        for i in range(5):
+            cache.put(i, FakeRow(row_bytes), 0.5)
+
+        self.assertEqual(len(cache), 3)
+        self.assertLessEqual(cache.nbytes, cache.max_bytes)
+        self.assertNotIn(0, cache)
+
+        cache.clear()
+        self.assertEqual(cache.nbytes, 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,475 @@
+import unittest
+import numpy as np
+import torch
+import sys
+import os
+import time
+
+# Add src to path (Up 2 levels from tests/)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from src.engine.titan_brain import TitanNet
+from src.engine.mcts import SpatialMCTS, MCTSNode
+from src.engine.parallel_mcts import RootParallelMCTS
+from src.engine.array_tree import ArrayTree, ArrayMCTS
+from src.engine.ponder import Ponderer
+
+VOCAB = 60
+
+class MockFE:
+    def __init__(self, vocab_size):
+        self.vocab = {i: i for i in range(1, vocab_size)}
+
+def make_state(picks=None):
+    """Builds a B=1 board like DraftStrategist.parse_lobby does."""
+    picks = picks or [0] * 10
+    return (
+        torch.tensor([picks], dtype=torch.long),
+        torch.arange(1, 11).unsqueeze(0).long(),
+        torch.tensor([[11, 12, 13, 14, 15, 16, 17, 18, 19, 20]], dtype=torch.long),
+        torch.zeros(1, 10).float(),
+        torch.tensor([[6.0, 14.23, 0.0]]),
+        torch.tensor([[1, 4, 5, 8, 9, 2, 3, 6, 7, 10]], dtype=torch.long),
+    )
+
+class CountingModel:
+    """Wraps TitanNet and records the batch size of every forward pass."""
+    def __init__(self, model):
+        self.model = model
+        self.batches = []
+    def eval(self):
+        self.model.eval()
+    def parameters(self):
+        return self.model.parameters()
+    def __call__(self, *args, **kwargs):
+        self.batches.append(args[0].size(0))
+        return self.model(*args, **kwargs)
+
+def walk(node):
+    yield node
+    for child in node.children.values():
+        yield from walk(child)
+
+class TestMCTSSearch(unittest.TestCase):
+    def setUp(self):
+        torch.manual_seed(0)
+        self.model = TitanNet(vocab_size=VOCAB, d_model=32, nhead=8, num_layers=2)
+        self.model.eval()
+        self.fe = MockFE(VOCAB)
+
+    def test_batched_search_visits(self):
+        """Batched search runs exactly n_sims simulations and releases all virtual loss."""
+        state = make_state([21, 22, 23, 0, 0, 0, 0, 0, 0, 0])
+        mcts = SpatialMCTS(self.model, self.fe, n_sims=24, batch_size=8)
+        root = mcts.search(state, 3)
+
+        self.assertEqual(root.visits, 24)
+        self.assertEqual(sum(c.visits for c in root.children.values()), 24)
+        for node in walk(root):
+            self.assertEqual(node.virtual_loss, 0)
+
+        move = mcts.get_move(root)
+        self.assertNotIn(move, (0, 21, 22, 23))
+
+    def test_transposition_sharing(self):
+        """Identical boards share one node and one network evaluation."""
+        counter = CountingModel(self.model)
+        mcts = SpatialMCTS(counter, self.fe, n_sims=8)
+        state = make_state([21, 0, 0, 0, 0, 0, 0, 0, 0, 0])
+
+        mcts.set_context(state)
+        root = MCTSNode(state)
+        self.assertIs(mcts._get_node(root, 30, 1, root.board()), mcts._get_node(root, 30, 1, root.board()))
+        
+        a = mcts.apply_move(state, 30, 1)
+        b = mcts.apply_move(state, 30, 1)
+
+        rows = mcts.evaluate_rows([a, b, a])
+        self.assertEqual(counter.batches, [1])
+        self.assertEqual(rows[0][1], rows[1][1])
+
+        mcts.get_value(b)
+        mcts.evaluate_boards([mcts.apply_board_move(root.board(), 30, 1)])
+        self.assertEqual(counter.batches, [1])
+
+    def test_root_rows_cached(self):
+        """The root's policy row comes from the EvalCache after the first search, and matches evaluate()."""
+        counter = CountingModel(self.model)
+        state = make_state([21, 0, 0, 0, 0, 26, 0, 0, 0, 0])
+        mcts = SpatialMCTS(counter, self.fe)
+        first = mcts._root_candidates(state, 1, None)
+        self.assertEqual(counter.batches, [1])
+
+        again = SpatialMCTS(counter, self.fe, eval_cache=mcts.net_cache)
+        self.assertEqual(again._root_candidates(state, 1, None), first)
+        self.assertEqual(counter.batches, [1])
+
+        policy, _, sort_idx = mcts.evaluate(state)
+        np.testing.assert_allclose(mcts._root_rows(state, [1])[0][0], policy[mcts._pred_index(sort_idx, 1)], atol=1e-5)
+
+    def test_delta_states(self):
+        """Delta nodes rebuild the same boards apply_move produces, and buffered batches match evaluate_batch."""
+        state = make_state([21, 22, 0, 0, 0, 0, 0, 0, 0, 0])
+        mcts = SpatialMCTS(self.model, self.fe, n_sims=16, batch_size=4)
+        root = mcts.search(state, 2)
+
+        child = next(iter(root.children.values()))
+        self.assertIsNone(child._state)
+        expected = mcts.apply_move(state, child.action, 2)
+        for got, ref in zip(child.state, expected):
+            self.assertTrue(torch.equal(got, ref))
+
+        grand = next(iter(child.children.values()))
+        boards = [child.board(), grand.board()]
+        slots = [mcts.next_empty(p) for p, _ in boards]
+        rows, val = mcts._forward_boards(boards, slots)
+        ref_pol, ref_val, ref_sort = mcts.evaluate_batch([child.state, grand.state])
+        ref_rows = [ref_pol[j][mcts._pred_index(ref_sort[j], s)] for j, s in enumerate(slots)]
+        np.testing.assert_allclose(rows, ref_rows, rtol=1e-5, atol=1e-5)
+        np.testing.assert_allclose(val, ref_val, rtol=1e-5, atol=1e-5)
+
+    def test_value_and_row_entry_points(self):
+        """predict_value / predict_rows match the matching parts of forward()."""
+        states = [make_state([21, 22, 0, 0, 0, 0, 0, 0, 0, 0]), make_state([21, 22, 23, 24, 25, 26, 27, 28, 29, 30])]
+        batch = [torch.cat([s[i] for s in states], dim=0) for i in range(6)]
+        with torch.no_grad():
+            out = self.model(*batch[:5], x_times=batch[5])
+            encoded = self.model.encode(*batch[:5], x_times=batch[5])
+            values = self.model.predict_value(encoded)
+            rows, row_values = self.model.predict_rows(encoded, torch.tensor([7, -1]))
+
+        np.testing.assert_allclose(values.numpy(), out['value'][:, 0].numpy(), atol=1e-6)
+        np.testing.assert_allclose(row_values.numpy(), values.numpy(), atol=1e-6)
+        sort_idx = out['sort_indices'][0].numpy()
+        mcts = SpatialMCTS(self.model, self.fe)
+        np.testing.assert_allclose(rows[0].numpy(), out['policy'][0][mcts._pred_index(sort_idx, 7)].numpy(), atol=1e-5)
+        self.assertAlmostEqual(mcts.get_value(states[1]), float(values[1]), places=5)
+
+    def test_tree_reuse_after_pick(self):
+        """A pick in another slot adopts the matching subtree as the new root child."""
+        state = make_state([21, 0, 0, 0, 0, 0, 0, 0, 0, 0])
+        valid = {40, 41}
+        mcts = SpatialMCTS(self.model, self.fe, n_sims=16, batch_size=4)
+        root = mcts.search(state, 3, valid)
+
+        child = root.children[40]
+        self.assertTrue(child.children)
+        g_action, grand = max(child.children.items(), key=lambda kv: kv[1].visits)
+        reused_visits = grand.visits
+
+        picks = state[0].clone()
+        picks[0][1] = g_action
+        advanced = (picks,) + state[1:]
+
+        mcts = SpatialMCTS(self.model, self.fe, n_sims=16, batch_size=4)
+        root2 = mcts.search(advanced, 3, valid - {g_action}, prev_root=root)
+
+        self.assertIs(root2.children[40], grand)
+        self.assertIsNone(root2.children[40].parent.parent)
+        self.assertGreaterEqual(root2.children[40].visits, reused_visits)
+        self.assertGreaterEqual(root2.visits, 16)
+
+    def test_tree_reuse_transpositions(self):
+        """The most visited transposition is adopted; children for a slot no longer next are dropped."""
+        state = make_state([21, 0, 0, 0, 0, 0, 0, 0, 0, 0])
+        prev = MCTSNode(state, slot_idx=3)
+        def chain(parent, moves, visits):
+            for slot, action, t in moves:
+                node = MCTSNode(None, parent=parent, action=action, slot_idx=slot, time=t)
+                parent.children[action] = node
+                parent = node
+            node.visits = visits
+            return node
+        shallow = chain(prev, [(1, 50, 11), (2, 51, 12), (3, 40, 13)], visits=2)
+        deep = chain(prev, [(2, 51, 11), (1, 50, 12), (3, 40, 13)], visits=9)
+        stale = MCTSNode(None, parent=deep, action=30, slot_idx=4, time=14)
+        deep.children[30] = stale
+        deep.expanded_slot = 4
+
+        picks = state[0].clone()
+        picks[0][1], picks[0][2] = 50, 51
+        mcts = SpatialMCTS(self.model, self.fe, n_sims=8, batch_size=4)
+        root = mcts.search((picks,) + state[1:], 3, {40, 41}, prev_root=prev,
+                           pick_order=[0, 1, 2, 3, 5, 4, 6, 7, 8, 9])
+
+        self.assertIs(root.children[40], deep)
+        self.assertNotIn(stale, deep.children.values())
+        self.assertTrue(all(c.slot_idx == 5 for c in deep.children.values()))
+        self.assertIsNot(root.children[40], shallow)
+
+    def test_anytime_deadline(self):
+        """An expired budget still yields one wave; a long one is capped by max_sims."""
+        state = make_state([21, 22, 23, 0, 0, 0, 0, 0, 0, 0])
+        mcts = SpatialMCTS(self.model, self.fe, n_sims=50, batch_size=4, max_sims=12)
+
+        root = mcts.search(state, 3, time_budget=0.0)
+        self.assertEqual(root.visits, 4)
+        self.assertIs(mcts.root, root)
+
+        root = mcts.search(state, 3, time_budget=60.0)
+        self.assertEqual(root.visits, 12)
+
+    def test_root_parallel_merge(self):
+        """Worker root statistics are summed into one root."""
+        state = make_state([21, 22, 23, 0, 0, 0, 0, 0, 0, 0])
+        parallel = RootParallelMCTS(self.model, self.fe, workers=2)
+        root = parallel._merge(state, 3, [
+            {40: (3, 1.5, 0.2)},
+            {40: (1, 0.5, 0.4), 41: (2, 1.0, 0.1)},
+        ])
+
+        self.assertEqual(root.visits, 6)
+        self.assertEqual(root.children[40].visits, 4)
+        self.assertAlmostEqual(root.children[40].value_sum, 2.0)
+        self.assertAlmostEqual(root.children[40].prior, 0.3)
+        self.assertEqual(root.children[41].state[0][0, 3].item(), 41)
+
+    def test_vectorized_masking(self):
+        """Masked softmax matches the reference loop and drops bans, picks and padding."""
+        state = make_state([21, 22, 0, 0, 0, 0, 0, 0, 0, 0])
+        mcts = SpatialMCTS(self.model, self.fe)
+        logits = np.random.default_rng(0).normal(size=VOCAB).astype(np.float32)
+        valid = set(range(5, 40))
+
+        probs = mcts.mask_logits(logits, state, valid)
+
+        ref = np.exp(logits - logits.max())
+        for i in range(VOCAB):
+            if i == 0 or i in (21, 22) or 11 <= i <= 20 or i not in valid:
+                ref[i] = 0.0
+        ref /= ref.sum()
+        np.testing.assert_allclose(probs, ref, rtol=1e-5, atol=1e-7)
+
+        idx, vals = mcts._top_k(probs, 3)
+        self.assertEqual(idx, [int(i) for i in np.argsort(-ref)[:3]])
+        self.assertTrue(vals[0] >= vals[1] >= vals[2])
+
+    def test_multi_root_search(self):
+        """All open ally slots are searched together: shared passes, n_sims visits per root."""
+        counter = CountingModel(self.model)
+        state = make_state([21, 0, 0, 0, 0, 26, 0, 0, 0, 0])
+        mcts = SpatialMCTS(counter, self.fe, n_sims=8, batch_size=4)
+        roots = mcts.search_multi(state, [1, 2, 3, 4])
+
+        self.assertEqual(sorted(roots), [1, 2, 3, 4])
+        for slot, root in roots.items():
+            self.assertEqual(root.visits, 8)
+            self.assertEqual(root.expanded_slot, slot)
+            for action, child in root.children.items():
+                self.assertEqual(child.board()[0][slot], action)
+        # One root pass (a row per slot), then waves of 4 roots x 4 paths
+        self.assertEqual(counter.batches[0], 4)
+        self.assertGreater(max(counter.batches), 4)
+
+    def test_fast_mode_scoring(self):
+        """Every legal champion is scored in one forward pass and ranked for the picking side."""
+        counter = CountingModel(self.model)
+        state = make_state([21, 22, 0, 0, 0, 0, 0, 0, 0, 0])
+        mcts = SpatialMCTS(counter, self.fe)
+
+        root = mcts.score_all(state, 7)
+        legal = [a for a in range(1, VOCAB) if a not in (21, 22) and not 11 <= a <= 20]
+        self.assertEqual(sorted(root.children), legal)
+        self.assertEqual(counter.batches, [len(legal)])
+
+        # Red slot: lowest Blue win probability first
+        values = [c.value_sum for c in root.children.values()]
+        self.assertEqual(values, sorted(values))
+        self.assertEqual(mcts.get_move(root), next(iter(root.children)))
+
+    def test_endgame_solver(self):
+        """Two open slots: each of our picks is worth the reply side's best answer (exact minimax)."""
+        state = make_state([21, 22, 23, 24, 0, 26, 27, 28, 29, 0])
+        ours = {40, 41, 42}
+        mcts = SpatialMCTS(self.model, self.fe, n_sims=50, endgame_budget=10000)
+        root = mcts.search(state, 4, ours)
+
+        self.assertTrue(root.solved)
+        self.assertEqual(sorted(root.children), sorted(ours))
+        legal = [a for a in range(1, VOCAB) if a not in (21, 22, 23, 24, 26, 27, 28, 29) and not 11 <= a <= 20]
+        for action, child in root.children.items():
+            after = mcts.apply_move(state, action, 4)
+            replies = [mcts.apply_move(after, r, 9) for r in legal if r != action]
+            _, values, _ = mcts.evaluate_batch(replies)
+            self.assertAlmostEqual(child.value_sum, float(values.min()), places=5) # Red answers
+        # Blue picks: best (highest) value first
+        values = [c.value_sum for c in root.children.values()]
+        self.assertEqual(values, sorted(values, reverse=True))
+
+        # Multi-root search returns the same solved root
+        solved = mcts.search_multi(state, [4], ours)[4]
+        self.assertTrue(solved.solved)
+        self.assertEqual(list(solved.children), list(root.children))
+
+        # Over budget: regular search
+        mcts = SpatialMCTS(self.model, self.fe, n_sims=8, endgame_budget=10)
+        self.assertFalse(mcts.search(state, 4, ours).solved)
+
+        # The other open slot picks first: not a (move, reply) endgame
+        mcts = SpatialMCTS(self.model, self.fe, n_sims=8, endgame_budget=10000)
+        self.assertFalse(mcts.search(state, 4, ours, pick_order=[0, 1, 2, 3, 9, 4, 5, 6, 7, 8]).solved)
+
+    def test_batched_rollouts(self):
+        """Rollouts advance in lockstep (one pass per ply) and stop at the cutoff depth."""
+        counter = CountingModel(self.model)
+        state = make_state([21, 22, 23, 24, 25, 26, 0, 0, 0, 0])
+        mcts = SpatialMCTS(counter, self.fe)
+        mcts.set_context(state)
+        mcts.base_mask = mcts._build_base_mask(state, VOCAB)
+        board = MCTSNode(state).board()
+        boards = [mcts.apply_board_move(board, a, 6) for a in (30, 31, 32)]
+
+        full = mcts.rollout_values(boards)
+        # 3 empty slots left: 3 plies + the full boards, all three boards per pass
+        self.assertEqual(counter.batches, [3, 3, 3, 3])
+
+        counter.batches.clear()
+        mcts.net_cache.clear()
+        mcts.rollout_depth = 1
+        cut = mcts.rollout_values(boards)
+        self.assertEqual(counter.batches, [3, 3])
+        self.assertEqual(len(cut), 3)
+        self.assertEqual(len(full), 3)
+
+    def test_prefix_kv_cache(self):
+        """Boards extending the root give forward()'s outputs through the Prefix KV-Cache."""
+        state = make_state([21, 22, 0, 0, 0, 0, 0, 0, 0, 0])
+        mcts = SpatialMCTS(self.model, self.fe)
+        mcts.set_context(state)
+        board = MCTSNode(state).board()
+        b1 = mcts.apply_board_move(board, 30, 2)
+        b2 = mcts.apply_board_move(b1, 31, 7)
+        boards = [board, b1, b2, mcts.apply_board_move(b2, 32, 5)]
+
+        slots = [mcts.next_empty(p) for p, _ in boards]
+        fast = mcts._forward_boards(boards, slots)
+        self.assertIsNotNone(mcts._prefix)
+        mcts.incremental = False
+        full = mcts._forward_boards(boards, slots)
+        for a, b in zip(fast, full):
+            np.testing.assert_allclose(a, b, atol=1e-5)
+
+        # A changed root pick cannot use the prefix
+        mcts.incremental = True
+        changed = (board[0].copy(), board[1])
+        changed[0][0] = 40
+        mcts._forward_boards([changed, b1])
+        self.assertFalse(mcts._extends_prefix(2))
+
+    def test_progressive_widening(self):
+        """Children are created as visits grow; the rest wait in node.candidates."""
+        state = make_state([21, 22, 23, 0, 0, 0, 0, 0, 0, 0])
+        for batch_size in (1, 4):
+            mcts = SpatialMCTS(self.model, self.fe, n_sims=16, batch_size=batch_size, widening=1.0)
+            root = mcts.search(state, 3)
+
+            self.assertEqual(root.visits, 16)
+            # ceil(1.0 * sqrt(n + 1)) children at most, out of 20 ranked candidates
+            self.assertLessEqual(len(root.children), 5)
+            self.assertEqual(len(root.children) + len(root.candidates), 20)
+            priors = [c.prior for c in root.children.values()]
+            self.assertTrue(all(p >= q for p in priors for _, q in root.candidates))
+            for node in walk(root):
+                self.assertEqual(node.virtual_loss, 0)
+                if node.children:
+                    self.assertLessEqual(len(node.children), max(1, int(np.ceil(np.sqrt(node.visits + 1)))))
+
+    def test_gumbel_root(self):
+        """Sequential Halving spends exactly n_sims and concentrates visits on the chosen move."""
+        state = make_state([21, 22, 23, 0, 0, 0, 0, 0, 0, 0])
+        for batch_size in (1, 4):
+            mcts = SpatialMCTS(self.model, self.fe, n_sims=48, batch_size=batch_size, seed=0, root_policy="gumbel")
+            root = mcts.search(state, 3)
+
+            self.assertEqual(root.visits, 48)
+            visited = [c for c in root.children.values() if c.visits > 0]
+            self.assertLessEqual(len(visited), 16) # GUMBEL_M sampled moves
+            move = mcts.get_move(root)
+            self.assertIs(next(iter(root.children.values())), root.children[move])
+            self.assertEqual(root.children[move].visits, max(c.visits for c in visited))
+            for node in walk(root):
+                self.assertEqual(node.virtual_loss, 0)
+                self.assertIsNone(node.schedule)
+
+    def test_ponder_hypotheses(self):
+        """Pondering grows one root per likely enemy pick and hands it over for Tree Reuse."""
+        state = make_state([21, 0, 0, 0, 0, 0, 0, 0, 0, 0])
+        make_mcts = lambda: SpatialMCTS(self.model, self.fe, batch_size=4)
+        ponder = Ponderer()
+        ponder.resume({
+            "key": "lobby", "make_mcts": make_mcts, "state": state, "slot": 1, "enemy_slot": 5,
+            "valid_actions": set(range(30, 50)), "pick_order": [0, 5, 1, 2, 3, 4, 6, 7, 8, 9]
+        })
+        deadline = time.time() + 30
+        while time.time() < deadline and len(ponder.roots) < 3:
+            time.sleep(0.05)
+        ponder.pause()
+
+        self.assertEqual(len(ponder.roots), 3)
+        for (picks, _, _), root in ponder.roots.items():
+            self.assertIn(picks[5], range(30, 50))
+            self.assertGreater(root.visits, 0)
+
+        # The real lock-in: same board as one hypothesis
+        key, pondered = next(iter(ponder.roots.items()))
+        picks = state[0].clone()
+        picks[0][5] = key[0][5]
+        self.assertIs(ponder.take(make_mcts().board_key((picks,) + state[1:])), pondered)
+        self.assertNotIn(key, ponder.roots) # Handed over: the ponder thread no longer grows it
+        ponder.stop()
+        self.assertEqual(ponder.roots, {})
+
+    def test_ponder_wakes_after_idle(self):
+        """Every resume() wakes an idle ponder thread (no lost wakeups)."""
+        ponder = Ponderer()
+        ran = []
+        for i in range(50):
+            ponder.resume(tasks=[lambda i=i: ran.append(i)])
+            deadline = time.time() + 5
+            while time.time() < deadline and len(ran) <= i:
+                time.sleep(0.001)
+            self.assertEqual(ran, list(range(i + 1)))
+        ponder.stop()
+
+    def test_array_tree_search(self):
+        """ArrayMCTS keeps contiguous child blocks, consistent visit counts and a usable root view."""
+        state = make_state([21, 22, 23, 0, 0, 0, 0, 0, 0, 0])
+        mcts = ArrayMCTS(self.model, self.fe, n_sims=24, batch_size=8)
+        root = mcts.search(state, 3)
+        tree = mcts.tree
+
+        self.assertEqual(root.visits, 24)
+        self.assertEqual(int(tree.visits[tree.children(0)].sum()), 24)
+        self.assertFalse(tree.virtual_loss[:len(tree)].any())
+        for node in range(len(tree)):
+            for c in tree.children(node):
+                self.assertEqual(tree.parent[c], node)
+        self.assertNotIn(mcts.get_move(root), (0, 21, 22, 23))
+
+    def test_array_tree_skips_masked_children(self):
+        """Leaves only get children for legal tokens, even when fewer than Top-K remain."""
+        mcts = ArrayMCTS(self.model, MockFE(4), n_sims=8, batch_size=4)
+        mcts.search(make_state([1, 0, 0, 0, 0, 0, 0, 0, 0, 0]), 3)
+        tree = mcts.tree
+        self.assertGreater(len(tree), 1)
+        self.assertTrue((tree.prior[1:len(tree)] > 0).all())
+        self.assertTrue(set(tree.action[1:len(tree)].tolist()) <= {2, 3})
+
+    def test_array_tree_select_matches_nodes(self):
+        """Vectorized PUCT picks the same child as SpatialMCTS.select_child."""
+        state = make_state([21, 0, 0, 0, 0, 0, 0, 0, 0, 0])
+        mcts = SpatialMCTS(self.model, self.fe)
+        tree = ArrayTree(capacity=2)
+        tree.add_root(state, 1, 1)
+        tree.add_children(0, [30, 31, 32], [0.5, 0.3, 0.2], [2] * 3, [2] * 3)
+        tree.visits[:4] = [10, 6, 3, 1]
+        tree.value_sum[1:4] = [2.0, 2.5, 0.9]
+        tree.virtual_loss[2] = 1
+
+        view = tree.to_node(0)
+        view.children[31].virtual_loss = 1
+        self.assertEqual(tree.capacity, 4)
+        self.assertEqual(int(tree.action[tree.select_child(0, 1.0)]), mcts.select_child(view).action)
+
+if __name__ == '__main__':
+    unittest.main()
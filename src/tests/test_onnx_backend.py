@@ -0,0 +1,92 @@
+import unittest
+import importlib.util
+import tempfile
+import numpy as np
+import torch
+import sys
+import os
+
+# Add src to path (Up 2 levels from tests/)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from src.engine.titan_brain import TitanBrain, OnnxTitanRuntime, example_inputs, export_onnx, onnx_path
+from src.engine.mcts import SpatialMCTS
+
+VOCAB = 60
+
+class MockFE:
+    def __init__(self, vocab_size):
+        self.vocab = {i: i for i in range(1, vocab_size)}
+
+@unittest.skipUnless(importlib.util.find_spec("onnxruntime"), "onnxruntime not installed")
+class TestOnnxBackend(unittest.TestCase):
+    """Parity of the onnxruntime backend with the torch model it was exported from."""
+    @classmethod
+    def setUpClass(cls):
+        torch.manual_seed(0)
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.brain = TitanBrain(os.path.join(cls.tmp.name, "titan.pt"))
+        cls.brain.device = torch.device("cpu")
+        cls.brain.initialize(vocab_size=VOCAB)
+        cls.brain.model.eval()
+        cls.brain.save()
+        export_onnx(cls.brain.model, onnx_path(cls.brain.model_path), batch_size=4)
+        cls.runtime = OnnxTitanRuntime(onnx_path(cls.brain.model_path))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def assertParity(self, inputs):
+        with torch.no_grad():
+            ref = self.brain.model(*inputs)
+        got = self.runtime(*inputs)
+        self.assertTrue(torch.equal(got['sort_indices'], ref['sort_indices']))
+        self.assertTrue(torch.allclose(got['policy'], ref['policy'], atol=1e-4))
+        self.assertTrue(torch.allclose(got['value'], ref['value'], atol=1e-5))
+
+    def test_dynamic_batch(self):
+        """Batch sizes other than the exported one run through the same graph."""
+        for b in (1, 7):
+            self.assertParity(example_inputs(b))
+
+    def test_time_sorting_and_ties(self):
+        """Per-row pick orders, and tied times (empty picks) sorted stably as in torch."""
+        xp, xt, xb, xm, xmeta, _ = example_inputs(3)
+        xp = torch.tensor([[0] * 10, [5, 0, 0, 0, 0, 6, 7, 0, 0, 0], [1, 2, 3, 4, 5, 6, 7, 8, 9, 10]])
+        x_times = torch.tensor([
+            [0] * 10,
+            [1, 0, 0, 0, 0, 2, 3, 0, 0, 0],
+            [10, 9, 8, 7, 6, 5, 4, 3, 2, 1],
+        ])
+        self.assertParity((xp, xt, xb, xm, xmeta, x_times))
+
+    def test_search_rows(self):
+        """Search policy rows and values match between backends (generic full-forward path)."""
+        state = example_inputs(1)
+        boards = [(state[0][0].numpy().copy(), state[5][0].numpy().copy())]
+        picks, times = boards[0]
+        picks, times = picks.copy(), times.copy()
+        picks[2], times[2] = 11, 11
+        boards.append((picks, times))
+
+        results = []
+        for model in (self.brain.model, self.runtime):
+            mcts = SpatialMCTS(model, MockFE(VOCAB), incremental=False)
+            mcts.set_context(state)
+            results.append(mcts.evaluate_boards(boards))
+        for (ref_row, ref_value), (row, value) in zip(*results):
+            self.assertTrue(np.allclose(row, ref_row, atol=1e-4))
+            self.assertAlmostEqual(value, ref_value, places=5)
+
+    def test_brain_selects_backend(self):
+        brain = TitanBrain(self.brain.model_path)
+        brain.device = torch.device("cpu")
+        brain.initialize(vocab_size=VOCAB)
+        self.assertTrue(brain.load(backend="onnx"))
+        self.assertIsInstance(brain.runtime, OnnxTitanRuntime)
+        self.assertTrue(brain.checkpoint_id.endswith(":onnx"))
+        brain.warmup(batch_sizes=(1, 4))
+
+if __name__ == '__main__':
+    unittest.main()
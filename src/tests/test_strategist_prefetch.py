@@ -0,0 +1,104 @@
+import unittest
+import copy
+import threading
+import sys
+import os
+
+# Add src to path (Up 2 levels from tests/)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from src.engine.strategist import DraftStrategist
+
+class MockFE:
+    vocab = {}
+
+def make_session():
+    """Blue-side lobby: cell 0 (us) picked, red cell 5 is picking next, then us in cell 1."""
+    return {
+        "localPlayerCellId": 1,
+        "myTeam": [{"cellId": i, "championId": 0, "assignedPosition": ""} for i in range(5)],
+        "theirTeam": [{"cellId": i, "championId": 0, "assignedPosition": ""} for i in range(5, 10)],
+        "bans": {"myTeamBans": [], "theirTeamBans": []},
+        "actions": [
+            [{"type": "pick", "actorCellId": 0, "championId": 266, "completed": True}],
+            [{"type": "pick", "actorCellId": 5, "championId": 0, "completed": False, "isInProgress": True}],
+            [{"type": "pick", "actorCellId": 1, "championId": 0, "completed": False}],
+        ],
+        "timer": {"adjustedTimeLeftInPhase": 25000},
+    }
+
+class TestSpeculativePrefetch(unittest.TestCase):
+    def setUp(self):
+        self.strategist = DraftStrategist(None, MockFE(), None)
+
+    def test_next_enemy_slot(self):
+        session = make_session()
+        self.assertEqual(self.strategist._next_enemy_slot(session), 5)
+
+        session["actions"][1][0]["completed"] = True
+        self.assertIsNone(self.strategist._next_enemy_slot(session)) # Our turn now
+
+    def test_session_key_matches_lock_in(self):
+        """A predicted lock-in and the real one produce the same key; a different pick does not."""
+        session = make_session()
+        session["myTeam"][0]["championId"] = 266
+        spec = self.strategist._speculative_session(session, 5, 103)
+
+        real = copy.deepcopy(session)
+        real["theirTeam"][0]["championId"] = 103
+        real["actions"][1][0].update(championId=103, completed=True, isInProgress=False)
+        real["timer"]["adjustedTimeLeftInPhase"] = 30000
+
+        key = self.strategist._session_key(spec, 6.0, 14.23, None)
+        self.assertEqual(key, self.strategist._session_key(real, 6.0, 14.23, None))
+        self.assertNotEqual(key, self.strategist._session_key(session, 6.0, 14.23, None))
+
+        other = self.strategist._speculative_session(session, 5, 104)
+        self.assertNotEqual(key, self.strategist._session_key(other, 6.0, 14.23, None))
+        self.assertEqual(session["theirTeam"][0]["championId"], 0) # Original untouched
+
+    def test_prefetch_hit(self):
+        """A predicted lock-in returns the prefetched result, adopts its caches and drops stale background work."""
+        session = make_session()
+        key = self.strategist._session_key(session, 6.0, 14.23, None)
+        result = ([{"id": "Aatrox"}], 0.55, "Observing", {})
+        root = object()
+        self.strategist.prefetched = {
+            key: (result, {'root': root, 'base_hash': 123, 'recs': ([{"id": "Aatrox"}], [266], [40])}),
+            "other pick": (None, {}),
+        }
+        self.strategist.ponder.job = {"key": "before the pick"}
+        self.strategist.ponder.tasks.append(lambda: True)
+
+        self.assertEqual(self.strategist.analyze(session), result)
+        self.assertIs(self.strategist.last_root, root)
+        self.assertEqual(self.strategist.last_base_hash, 123)
+        self.assertEqual(self.strategist.prefetched, {})
+        self.assertIsNone(self.strategist.ponder.job)
+        self.assertFalse(self.strategist.ponder.tasks)
+
+    def test_errors_resume_pondering(self):
+        """An analysis that fails part-way does not leave pondering paused."""
+        with self.assertRaises(Exception):
+            self.strategist.analyze(make_session()) # No brain: fails after pause()
+        self.assertFalse(self.strategist.ponder.interrupted())
+
+    def test_team_analysis_waits_for_analyze(self):
+        """analyze_team from another thread waits for a running analysis before touching the ponder thread."""
+        done = threading.Event()
+        def team():
+            try:
+                self.strategist.analyze_team(make_session()) # No brain: fails once it runs
+            except Exception:
+                pass
+            done.set()
+
+        with self.strategist.analysis_lock: # An analyze() in progress
+            threading.Thread(target=team, daemon=True).start()
+            self.assertFalse(done.wait(0.2))
+            self.assertFalse(self.strategist.ponder.interrupted())
+        self.assertTrue(done.wait(5))
+        self.assertFalse(self.strategist.ponder.interrupted())
+
+if __name__ == '__main__':
+    unittest.main()
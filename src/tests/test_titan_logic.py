@@ -39,6 +39,124 @@ class TestTitanLogic(unittest.TestCase):
         self.assertEqual(out['policy'].shape, (B, 20, Vocab))
         self.assertEqual(out['value'].shape, (B, 1))
 
+    def test_inference_encoder_matches_transformer(self):
+        """The opt-in SDPA encoder agrees with nn.TransformerEncoder within the documented tolerance."""
+        model = self.brain.model
+        xp = torch.tensor([[10, 20, 30, 0, 0, 40, 50, 0, 0, 0], [10, 20, 30, 31, 32, 40, 50, 51, 0, 0]])
+        xt = torch.arange(1, 11).expand(2, 10)
+        xb = torch.tensor([[1, 2, 3, 4, 5, 6, 7, 8, 9, 0]] * 2)
+        xm = torch.rand(2, 10)
+        xmeta = torch.rand(2, 3)
+        x_times = torch.tensor([[1, 4, 5, 8, 9, 2, 3, 6, 7, 10]] * 2)
+
+        self.assertFalse(model.sdpa_encoder) # Opt-in
+        with torch.no_grad():
+            ref = model(xp, xt, xb, xm, xmeta, x_times=x_times)
+            model.sdpa_encoder = True
+            fast = model(xp, xt, xb, xm, xmeta, x_times=x_times)
+            model.sdpa_encoder = False
+
+        self.assertTrue(torch.equal(fast['sort_indices'], ref['sort_indices']))
+        self.assertTrue(torch.allclose(fast['policy'], ref['policy'], atol=1e-5))
+        self.assertTrue(torch.allclose(fast['value'], ref['value'], atol=1e-6))
+
+    def test_torchscript_export(self):
+        """The traced artifact matches eager outputs at an untraced batch size, entry points included."""
+        import tempfile
+        from engine.titan_brain import export_torchscript, example_inputs
+        model = self.brain.model
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "titan.ts")
+            export_torchscript(model, path, batch_size=4)
+            scripted = torch.jit.load(path)
+
+        inputs = example_inputs(3)
+        slots = torch.tensor([4, 7, -1])
+        with torch.no_grad():
+            ref = model(*inputs)
+            got = scripted(*inputs)
+            ref_rows, ref_values = model.predict_rows(model.encode(*inputs), slots)
+            rows, values = scripted.predict_rows(scripted.encode(*inputs), slots)
+
+        self.assertTrue(torch.allclose(got['policy'], ref['policy'], atol=1e-5))
+        self.assertTrue(torch.allclose(got['value'], ref['value'], atol=1e-6))
+        self.assertTrue(torch.allclose(rows, ref_rows, atol=1e-5))
+        self.assertTrue(torch.allclose(values, ref_values, atol=1e-6))
+
+    def test_scripted_runtime_prefix_cache(self):
+        """With a TorchScript runtime, searches evaluate full boards only (no Prefix KV-Cache)."""
+        import tempfile
+        from engine.titan_brain import example_inputs, export_torchscript, pack_checkpoint, scripted_path
+        with tempfile.TemporaryDirectory() as tmp:
+            brain = TitanBrain(os.path.join(tmp, "titan.pt"))
+            brain.device = self.device
+            brain.initialize(vocab_size=100)
+            torch.save(pack_checkpoint(self.brain.model), brain.model_path)
+            export_torchscript(self.brain.model, scripted_path(brain.model_path), batch_size=4)
+            self.assertTrue(brain.load(prefer_scripted=True))
+
+        self.assertIsNot(brain.runtime, brain.model)
+        mcts = SpatialMCTS(brain.runtime, MockFE(100))
+        mcts.set_context(example_inputs(1))
+        mcts._in_picks, mcts._in_times = (b[None].copy() for b in mcts._prefix_board)
+        self.assertFalse(mcts._extends_prefix(1))
+        mcts.model = brain.model
+        self.assertTrue(mcts._extends_prefix(1))
+
+    @unittest.skipUnless({'fbgemm', 'qnnpack'} & set(torch.backends.quantized.supported_engines), "No quantized CPU engine")
+    def test_int8_quantization(self):
+        """The dynamic INT8 copy stays close to fp32 (entry points included) and leaves the original intact."""
+        from engine.titan_brain import quantize_int8, example_inputs
+        model = self.brain.model
+        int8 = quantize_int8(model)
+        self.assertFalse(hasattr(model.transformer.layers[0], 'qkv_proj'))
+
+        inputs = example_inputs(3)
+        slots = torch.tensor([4, 7, -1])
+        with torch.no_grad():
+            ref = model(*inputs)
+            got = int8(*inputs)
+            _, ref_values = model.predict_rows(model.encode(*inputs), slots)
+            _, values = int8.predict_rows(int8.encode(*inputs), slots)
+
+        self.assertEqual(got['policy'].shape, ref['policy'].shape)
+        self.assertTrue(torch.equal(got['sort_indices'], ref['sort_indices']))
+        self.assertTrue(torch.allclose(got['value'], ref['value'], atol=0.05))
+        self.assertTrue(torch.allclose(values, ref_values, atol=0.05))
+
+    def test_compact_vocab_checkpoint(self):
+        """A sliced checkpoint records its vocab size; load() rebuilds the model and kept logits are unchanged."""
+        import tempfile
+        from engine.titan_brain import TitanNet, compact_path, example_inputs, pack_checkpoint, slice_vocab
+        model = self.brain.model
+        compact = TitanNet(**{**model.config, "vocab_size": 40})
+        compact.load_state_dict(slice_vocab(model.state_dict(), 40))
+        with tempfile.TemporaryDirectory() as tmp:
+            # Named the way the engine looks for it (core.py)
+            brain = TitanBrain(compact_path(os.path.join(tmp, "titan.pt"), 40))
+            self.assertEqual(os.path.basename(brain.model_path), "titan_v40.pt")
+            brain.device = self.device
+            torch.save(pack_checkpoint(compact), brain.model_path)
+            brain.initialize(vocab_size=100)
+            self.assertTrue(brain.load(prefer_scripted=False))
+
+            # Older checkpoints: plain state dicts
+            legacy = TitanBrain(os.path.join(tmp, "legacy.pt"))
+            legacy.device = self.device
+            torch.save(model.state_dict(), legacy.model_path)
+            legacy.initialize(vocab_size=40)
+            self.assertTrue(legacy.load(prefer_scripted=False))
+        self.assertEqual(brain.vocab_size, 40)
+        self.assertEqual(legacy.vocab_size, 100)
+
+        inputs = example_inputs(2)
+        with torch.no_grad():
+            ref = model(*inputs)
+            got = brain.model(*inputs)
+        self.assertEqual(got['policy'].shape, (2, 20, 40))
+        self.assertTrue(torch.allclose(got['policy'], ref['policy'][..., :40], atol=1e-6))
+        self.assertTrue(torch.allclose(got['value'], ref['value'], atol=1e-6))
+
     def test_overfit_single_sample(self):
         self.brain.model.train()
         optimizer = self.brain.optimizer
@@ -0,0 +1,106 @@
+import sys
+import os
+import time
+import argparse
+
+# Setup Path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_dir = os.path.dirname(os.path.dirname(current_dir))
+sys.path.append(src_dir)
+
+import numpy as np
+import torch
+
+from src.engine.titan_brain import TitanBrain, VOCAB_SIZE
+from src.engine.datasets import TitanMemoryDataset
+from src.engine.mcts import SpatialMCTS
+
+class VocabStub:
+    """SpatialMCTS only needs len(fe.vocab) for the legal move mask."""
+    def __init__(self, vocab_size):
+        self.vocab = {i: i for i in range(1, vocab_size)}
+
+def load_brain(checkpoint):
+    brain = TitanBrain(checkpoint)
+    brain.initialize(vocab_size=VOCAB_SIZE)
+    if not brain.load():
+        print("[BENCH] WARNING: Using random weights.")
+    brain.model.eval()
+    return brain
+
+def make_positions(dataset, count, ply, device):
+    """
+    Cuts validation drafts after `ply` picks (in time order). Returns
+    [(state, active_slot, pick_order)], the active slot being the next pick.
+    """
+    positions = []
+    for i in range(min(count, len(dataset))):
+        xp, xt, xb, xm, xmeta, x_times, _ = dataset[i]
+        order = [int(s) for s in np.argsort(x_times.numpy(), kind='stable')]
+        picks = xp.clone()
+        for s in order[ply:]:
+            picks[s] = 0
+        state = tuple(t.unsqueeze(0).to(device) for t in (picks, xt, xb, xm, xmeta, x_times))
+        positions.append((state, order[ply], order))
+    return positions
+
+def side_value(value, slot):
+    """Blue win chance -> win chance of the side picking slot."""
+    return value if 0 <= slot <= 4 else 1.0 - value
+
+def reference(brain, fe, state, slot, order, sims, batch_size):
+    """
+    Ground truth for one position: child values of a long PUCT search, with
+    one-ply Value Head scores for the moves it never visited.
+    Returns (reference move, {action: value for the picking side}).
+    """
+    mcts = SpatialMCTS(brain.model, fe, n_sims=sims, batch_size=batch_size)
+    values = {a: side_value(c.value_sum, slot)
+              for a, c in mcts.score_all(state, slot, pick_order=order).children.items()}
+    root = mcts.search(state, slot, pick_order=order)
+    for a, c in root.children.items():
+        if c.visits > 0:
+            values[a] = side_value(c.value_sum / c.visits, slot)
+    return mcts.get_move(root), values
+
+def run(args):
+    brain = load_brain(args.checkpoint)
+    fe = VocabStub(VOCAB_SIZE)
+    dataset = TitanMemoryDataset(args.data)
+    positions = make_positions(dataset, args.positions, args.ply, brain.device)
+    sims_list = [int(s) for s in args.sims.split(",")]
+    policies = ("puct", "gumbel")
+
+    print(f"[BENCH] {len(positions)} positions, reference {args.reference_sims} sims")
+    refs = [reference(brain, fe, state, slot, order, args.reference_sims, args.batch_size)
+            for state, slot, order in positions]
+
+    print(f"{'policy':<8}{'sims':>6}{'top-1':>8}{'regret':>9}{'ms':>8}")
+    for policy in policies:
+        for n in sims_list:
+            hits, regrets, elapsed = 0, [], 0.0
+            for k, ((state, slot, order), (ref_move, values)) in enumerate(zip(positions, refs)):
+                mcts = SpatialMCTS(brain.model, fe, n_sims=n, batch_size=args.batch_size,
+                                   seed=args.seed + k, root_policy=policy)
+                t0 = time.perf_counter()
+                move = mcts.get_move(mcts.search(state, slot, pick_order=order))
+                elapsed += time.perf_counter() - t0
+                hits += move == ref_move
+                regrets.append(max(values.values()) - values.get(move, 0.0))
+            count = max(1, len(positions))
+            print(f"{policy:<8}{n:>6}{hits / count:>8.2f}{np.mean(regrets):>9.4f}{elapsed / count * 1000:>8.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recommendation quality vs simulation count: PUCT vs Gumbel root")
+    parser.add_argument('--checkpoint', type=str, default=os.path.join('checkpoints', 'titan_v3_best.pt'))
+    parser.add_argument('--data', type=str, default=os.path.join('data', 'titan_val_v3.pt'))
+    parser.add_argument('--positions', type=int, default=50, help='Validation drafts to test')
+    parser.add_argument('--ply', type=int, default=5, help='Picks made before the searched one')
+    parser.add_argument('--sims', type=str, default='8,16,32,64,128', help='Simulation counts to compare')
+    parser.add_argument('--reference_sims', type=int, default=2000)
+    parser.add_argument('--batch_size', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    with torch.no_grad():
+        run(args)
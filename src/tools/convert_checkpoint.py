@@ -0,0 +1,75 @@
+import sys
+import os
+import time
+import argparse
+
+# Setup Path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_dir = os.path.dirname(os.path.dirname(current_dir))
+sys.path.append(src_dir)
+
+import torch
+
+from src.engine.titan_brain import TitanBrain, TitanNet, example_inputs, unpack_checkpoint
+from src.engine.checkpoint import archive_path, file_hash, read_header
+
+def live_vocab():
+    """Champion -> token map the engine builds at startup (FeatureEngine.build_vocab over DDragon)."""
+    from src.data.ddragon import DataDragon
+    from src.engine.features import FeatureEngine
+    fe = FeatureEngine()
+    fe.build_vocab(DataDragon())
+    return fe.vocab
+
+def convert(checkpoint, out=None, data=None, with_vocab=True):
+    """Writes a .pt checkpoint as a flat archive and checks that it loads to the same model."""
+    payload = torch.load(checkpoint, map_location="cpu", weights_only=True)
+    state_dict, config = unpack_checkpoint(payload)
+    model = TitanNet(**config)
+    model.load_state_dict(state_dict)
+    model.eval()
+
+    brain = TitanBrain(checkpoint)
+    brain.device = torch.device("cpu")
+    brain.model = model
+    data_hash = file_hash(data) if data and os.path.exists(data) else None
+    out = brain.save_archive(out or archive_path(checkpoint), vocab=live_vocab() if with_vocab else None,
+                             data_hash=data_hash)
+
+    # Round trip: header only, then the memory-mapped load
+    t0 = time.perf_counter()
+    header = read_header(out)
+    t1 = time.perf_counter()
+    loaded = TitanBrain(out)
+    loaded.device = torch.device("cpu")
+    if not loaded.load(prefer_scripted=False):
+        print("[CKPT] FAILED: archive could not be loaded.")
+        return False
+    t2 = time.perf_counter()
+
+    loaded.model.eval()
+    with torch.no_grad():
+        inputs = example_inputs(4)
+        ref = model(*inputs)
+        got = loaded.model(*inputs)
+    if not (torch.equal(ref['policy'], got['policy']) and torch.equal(ref['value'], got['value'])):
+        print("[CKPT] FAILED: archive does not reproduce the checkpoint. Removing it.")
+        os.remove(out)
+        return False
+
+    meta = header["metadata"]
+    print(f"[CKPT] Wrote {out}: vocab_size {meta['config']['vocab_size']}, "
+          f"{len(meta['vocab'])} vocab entries, data hash {meta['data_hash'] or '-'}")
+    print(f"[CKPT] Header {1000 * (t1 - t0):.2f} ms, load {1000 * (t2 - t1):.2f} ms")
+    return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert a TitanNet checkpoint to the memory-mapped archive format")
+    parser.add_argument('--checkpoint', type=str, default=os.path.join('checkpoints', 'titan_v3_best.pt'))
+    parser.add_argument('--out', type=str, default=None, help='Archive path (default: checkpoint with .titan)')
+    parser.add_argument('--data', type=str, default=os.path.join('data', 'titan_train_v3.pt'),
+                        help='Training data recorded by hash in the header (skipped if missing)')
+    parser.add_argument('--no_vocab', action='store_true', help='Do not record the live DDragon vocab map')
+    args = parser.parse_args()
+
+    sys.exit(0 if convert(args.checkpoint, args.out, args.data, not args.no_vocab) else 1)
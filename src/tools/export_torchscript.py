@@ -0,0 +1,52 @@
+import sys
+import os
+import argparse
+
+# Setup Path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_dir = os.path.dirname(os.path.dirname(current_dir))
+sys.path.append(src_dir)
+
+import torch
+
+from src.engine.titan_brain import TitanBrain, VOCAB_SIZE, example_inputs, export_torchscript, scripted_path
+
+def export(checkpoint, out=None, batch_size=8):
+    """Writes the TorchScript artifact of a checkpoint and checks it against the eager model."""
+    brain = TitanBrain(checkpoint)
+    brain.initialize(vocab_size=VOCAB_SIZE)
+    if not brain.load(prefer_scripted=False):
+        print("[EXPORT] FAILED: checkpoint could not be loaded.")
+        return False
+    out = out or scripted_path(checkpoint)
+
+    print(f"[EXPORT] Tracing {checkpoint} -> {out}")
+    export_torchscript(brain.model, out, batch_size=batch_size)
+
+    # Parity: the artifact must reproduce the eager model at B=1 and the search batch size
+    scripted = torch.jit.load(out, map_location=brain.device)
+    scripted.eval()
+    worst = 0.0
+    with torch.no_grad():
+        for b in (1, batch_size):
+            inputs = example_inputs(b, brain.device)
+            ref = brain.model(*inputs)
+            got = scripted(*inputs)
+            for key in ('policy', 'value'):
+                worst = max(worst, (ref[key] - got[key]).abs().max().item())
+    print(f"[EXPORT] Max abs difference vs eager: {worst:.2e}")
+    if worst > 1e-4:
+        print("[EXPORT] FAILED: artifact does not match the eager model. Removing it.")
+        os.remove(out)
+        return False
+    print("[EXPORT] OK. TitanBrain.load() will prefer this artifact.")
+    return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export TitanNet inference entry points to TorchScript")
+    parser.add_argument('--checkpoint', type=str, default=os.path.join('checkpoints', 'titan_v3_best.pt'))
+    parser.add_argument('--out', type=str, default=None, help='Artifact path (default: checkpoint with .ts)')
+    parser.add_argument('--batch_size', type=int, default=8, help='Example batch size used for tracing')
+    args = parser.parse_args()
+
+    sys.exit(0 if export(args.checkpoint, args.out, args.batch_size) else 1)
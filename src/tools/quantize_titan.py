@@ -0,0 +1,108 @@
+import sys
+import os
+import time
+import argparse
+
+# Setup Path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_dir = os.path.dirname(os.path.dirname(current_dir))
+sys.path.append(src_dir)
+
+import torch
+from torch.utils.data import DataLoader
+
+from src.engine.titan_brain import TitanBrain, VOCAB_SIZE, example_inputs, export_torchscript, quantize_int8, quantized_path
+from src.engine.datasets import TitanMemoryDataset
+
+# Accuracy Gate (INT8 vs fp32 on the validation set)
+MAX_VALUE_MSE_DELTA = 0.002 # Max increase of the Value Head MSE vs the win labels
+MIN_TOP1_AGREEMENT = 0.95 # Min share of policy rows whose top-1 champion is unchanged
+MIN_TOP5_OVERLAP = 0.90 # Min mean overlap of the top-5 champions
+TOP_K = 5
+
+def compare(fp32, int8, loader, max_batches):
+    """Value MSE of both models vs the labels, and policy agreement on the real (non-empty) targets."""
+    sq_fp32, sq_int8, n_values = 0.0, 0.0, 0
+    top1, overlap, n_rows = 0.0, 0.0, 0
+    for i, batch in enumerate(loader):
+        if max_batches and i >= max_batches: break
+        xp, xt, xb, xm, xmeta, x_times, y = batch
+        inputs = (xp, xt, xb, xm, xmeta, x_times)
+        ref = fp32(*inputs)
+        got = int8(*inputs)
+
+        y = y.view(-1)
+        sq_fp32 += ((ref['value'].view(-1) - y) ** 2).sum().item()
+        sq_int8 += ((got['value'].view(-1) - y) ** 2).sum().item()
+        n_values += y.numel()
+
+        # Rows predicting a real ban/pick (same targets as TitanBrain.train_step)
+        raw_tokens = torch.cat([torch.zeros_like(xp[:, :1]), xb, xp], dim=1)
+        targets = torch.gather(raw_tokens, 1, ref['sort_indices'])[:, 1:]
+        live = targets != 0
+        ref_pol, got_pol = ref['policy'][live], got['policy'][live]
+        top1 += (ref_pol.argmax(-1) == got_pol.argmax(-1)).sum().item()
+        ref_k, got_k = ref_pol.topk(TOP_K, -1).indices, got_pol.topk(TOP_K, -1).indices
+        overlap += (ref_k.unsqueeze(-1) == got_k.unsqueeze(-2)).any(-1).float().mean(-1).sum().item()
+        n_rows += ref_pol.size(0)
+
+    n_values, n_rows = max(1, n_values), max(1, n_rows)
+    return {
+        'mse_fp32': sq_fp32 / n_values,
+        'mse_int8': sq_int8 / n_values,
+        'top1': top1 / n_rows,
+        'top5': overlap / n_rows,
+    }
+
+def latency(model, batch_size, repeats=50):
+    """Mean ms per forward at batch_size."""
+    inputs = example_inputs(batch_size)
+    model(*inputs)
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        model(*inputs)
+    return (time.perf_counter() - t0) / repeats * 1000
+
+def run(args):
+    brain = TitanBrain(args.checkpoint)
+    brain.device = torch.device("cpu") # Dynamic INT8 kernels are CPU-only
+    brain.initialize(vocab_size=VOCAB_SIZE)
+    if not brain.load(prefer_scripted=False):
+        print("[QUANT] FAILED: checkpoint could not be loaded.")
+        return False
+    fp32 = brain.model.eval()
+    int8 = quantize_int8(fp32)
+
+    loader = DataLoader(TitanMemoryDataset(args.data), batch_size=args.batch_size, shuffle=False)
+    stats = compare(fp32, int8, loader, args.max_batches)
+    delta = stats['mse_int8'] - stats['mse_fp32']
+    print(f"[QUANT] Value MSE   fp32 {stats['mse_fp32']:.5f}  int8 {stats['mse_int8']:.5f}  delta {delta:+.5f} (max {MAX_VALUE_MSE_DELTA})")
+    print(f"[QUANT] Policy top-1 agreement {stats['top1']:.3f} (min {MIN_TOP1_AGREEMENT})")
+    print(f"[QUANT] Policy top-{TOP_K} overlap {stats['top5']:.3f} (min {MIN_TOP5_OVERLAP})")
+    for b in (1, args.search_batch):
+        print(f"[QUANT] B={b:<3} fp32 {latency(fp32, b):.2f} ms  int8 {latency(int8, b):.2f} ms")
+
+    passed = delta <= MAX_VALUE_MSE_DELTA and stats['top1'] >= MIN_TOP1_AGREEMENT and stats['top5'] >= MIN_TOP5_OVERLAP
+    if not passed and not args.force:
+        print("[QUANT] FAILED: accuracy gate. Keep inference_precision = fp32.")
+        return False
+
+    out = args.out or quantized_path(args.checkpoint)
+    export_torchscript(int8, out, batch_size=args.search_batch)
+    print(f"[QUANT] {'OK' if passed else 'FORCED'}: wrote {out}. Set inference_precision = int8 to use it.")
+    return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dynamic INT8 quantization of TitanNet with an accuracy gate")
+    parser.add_argument('--checkpoint', type=str, default=os.path.join('checkpoints', 'titan_v3_best.pt'))
+    parser.add_argument('--data', type=str, default=os.path.join('data', 'titan_val_v3.pt'))
+    parser.add_argument('--out', type=str, default=None, help='Artifact path (default: checkpoint with .int8.ts)')
+    parser.add_argument('--batch_size', type=int, default=256)
+    parser.add_argument('--max_batches', type=int, default=0, help='Validation batches to compare (0 = all)')
+    parser.add_argument('--search_batch', type=int, default=8, help='Search batch size for tracing and timing')
+    parser.add_argument('--force', action='store_true', help='Write the artifact even if the gate fails')
+    args = parser.parse_args()
+
+    with torch.no_grad():
+        ok = run(args)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,68 @@
+import sys
+import os
+import argparse
+
+# Setup Path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_dir = os.path.dirname(os.path.dirname(current_dir))
+sys.path.append(src_dir)
+
+import torch
+
+from src.engine.titan_brain import TitanNet, compact_path, example_inputs, pack_checkpoint, slice_vocab, unpack_checkpoint
+
+def live_vocab_size():
+    """Token count the engine actually issues (FeatureEngine.build_vocab over DDragon) + the padding token."""
+    from src.data.ddragon import DataDragon
+    from src.engine.features import FeatureEngine
+    fe = FeatureEngine()
+    fe.build_vocab(DataDragon())
+    return len(fe.vocab) + 1
+
+def convert(checkpoint, out=None, vocab_size=None):
+    """Writes a copy of the checkpoint whose embedding and policy head cover only vocab_size tokens."""
+    payload = torch.load(checkpoint, map_location="cpu", weights_only=True)
+    state_dict, config = unpack_checkpoint(payload)
+    old_size = config["vocab_size"]
+    vocab_size = vocab_size or live_vocab_size()
+    if vocab_size <= 1 or vocab_size > old_size:
+        print(f"[VOCAB] FAILED: cannot cut a {old_size}-token checkpoint to {vocab_size} tokens.")
+        return False
+
+    full = TitanNet(**config)
+    full.load_state_dict(state_dict)
+    compact = TitanNet(**{**config, "vocab_size": vocab_size})
+    compact.load_state_dict(slice_vocab(state_dict, vocab_size))
+
+    # Parity: kept logits and the value must be unchanged
+    full.eval()
+    compact.eval()
+    with torch.no_grad():
+        inputs = example_inputs(4)
+        ref = full(*inputs)
+        got = compact(*inputs)
+    worst = max((ref['policy'][..., :vocab_size] - got['policy']).abs().max().item(),
+                (ref['value'] - got['value']).abs().max().item())
+    print(f"[VOCAB] Max abs difference on kept tokens: {worst:.2e}")
+    if worst > 1e-5:
+        print("[VOCAB] FAILED: compact model does not match the original.")
+        return False
+
+    # Default name: the engine prefers it over the full checkpoint while the live vocab has this size
+    out = out or compact_path(checkpoint, vocab_size)
+    torch.save(pack_checkpoint(compact), out)
+    before = sum(t.numel() for t in state_dict.values())
+    after = sum(t.numel() for t in compact.state_dict().values())
+    print(f"[VOCAB] {old_size} -> {vocab_size} tokens, {before:,} -> {after:,} parameters. Wrote {out}")
+    print("[VOCAB] Re-export TorchScript/ONNX/INT8 artifacts from the new checkpoint.")
+    return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cut TitanNet's champion embedding and policy head to the live vocab")
+    parser.add_argument('--checkpoint', type=str, default=os.path.join('checkpoints', 'titan_v3_best.pt'))
+    parser.add_argument('--out', type=str, default=None, help='Output path (default: checkpoint with _v<size>.pt)')
+    parser.add_argument('--vocab_size', type=int, default=None,
+                        help='Tokens to keep, padding included (default: live DDragon vocab + 1)')
+    args = parser.parse_args()
+
+    sys.exit(0 if convert(args.checkpoint, args.out, args.vocab_size) else 1)